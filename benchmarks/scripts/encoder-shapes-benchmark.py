@@ -0,0 +1,130 @@
+"""Time the Python encoder on deep and wide document shapes.
+
+Usage:
+    python benchmarks/scripts/encoder-shapes-benchmark.py [--baseline PATH] [--repeat N]
+
+``--baseline`` points at another checkout of this repository; its ``toon``
+package is timed on the same shapes in a separate process so the two can be
+compared. Shapes nested deeper than the baseline can handle are reported as
+failing with the error it raised.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def deep_objects(depth: int) -> Any:
+    value: Any = {"leaf": True}
+    for index in range(depth):
+        value = {"id": index, "child": value}
+    return value
+
+
+def deep_lists(depth: int) -> Any:
+    value: Any = [1, 2]
+    for index in range(depth):
+        value = [index, value]
+    return value
+
+
+def deep_list_items(depth: int) -> Any:
+    value: Any = {"name": "leaf"}
+    for index in range(depth):
+        value = {"name": f"node {index}", "children": [value, [index]]}
+    return value
+
+
+def wide_object(width: int) -> Any:
+    return {f"key{index}": {"value": index, "label": f"item {index}"} for index in range(width)}
+
+
+def wide_mixed_list(width: int) -> Any:
+    return {"items": [{"id": index, "tags": ["a", "b"], "meta": {"seen": index % 2 == 0}} for index in range(width)]}
+
+
+def wide_tabular(width: int) -> Any:
+    return {"rows": [{"id": index, "name": f"user {index}", "score": index / 7} for index in range(width)]}
+
+
+def shared_subtree(width: int) -> Any:
+    customer = {"id": 7, "name": "Ada", "address": {"city": "Paris", "zip": "75001"}, "tags": ["vip", "eu"]}
+    return {"orders": [{"id": index, "customer": customer, "total": index * 1.5} for index in range(width)]}
+
+
+SHAPES: Dict[str, Callable[[], Any]] = {
+    "deep objects (250)": lambda: deep_objects(250),
+    "deep lists (250)": lambda: deep_lists(250),
+    "deep list items (100)": lambda: deep_list_items(100),
+    "deep objects (5000)": lambda: deep_objects(5000),
+    "wide object (20k keys)": lambda: wide_object(20_000),
+    "wide mixed list (10k items)": lambda: wide_mixed_list(10_000),
+    "wide tabular (20k rows)": lambda: wide_tabular(20_000),
+    "shared subtree (10k refs)": lambda: shared_subtree(10_000),
+}
+
+
+def run(package_root: str, repeat: int) -> Dict[str, Any]:
+    sys.path.insert(0, package_root)
+    from toon import encode
+
+    results: Dict[str, Any] = {}
+    for name, build in SHAPES.items():
+        value = build()
+        try:
+            timings = timeit.repeat(lambda: encode(value), number=1, repeat=repeat)
+        except RecursionError as exc:
+            results[name] = f"{type(exc).__name__}"
+        else:
+            results[name] = min(timings)
+    return results
+
+
+def format_result(result: Any) -> str:
+    if isinstance(result, float):
+        return f"{result * 1000:10.2f} ms"
+    return f"{result:>13}"
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", help="path to another checkout to compare against")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--root", default=ROOT_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.json:
+        print(json.dumps(run(args.root, args.repeat)))
+        return
+
+    current = run(args.root, args.repeat)
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        output = subprocess.run(
+            [sys.executable, __file__, "--json", "--root", args.baseline, "--repeat", str(args.repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        baseline = json.loads(output)
+
+    width = max(map(len, SHAPES))
+    print(f"{'shape':<{width}}  {'current':>13}" + (f"  {'baseline':>13}" if baseline else ""))
+    for name in SHAPES:
+        line = f"{name:<{width}}  {format_result(current[name])}"
+        if baseline:
+            line += f"  {format_result(baseline[name])}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+import pathlib
+import sys
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from toon import Encoder, encode, encode_chunks
+
+
+def sample():
+    return {
+        "meta": {
+            "name": "export",
+            "tags": ["a", "b"],
+            "deep": {"rows": [{"id": i, "name": f"user {i}"} for i in range(40)], "total": 40},
+        },
+        "items": [{"id": i, "v": [1, 2]} if i % 3 else {"id": i} for i in range(20)],
+        "tail": "end",
+    }
+
+
+class ChunkTests(unittest.TestCase):
+    def test_single_chunk_matches_encode(self):
+        self.assertEqual(list(encode_chunks(sample(), 10_000)), [encode(sample())])
+        self.assertEqual(
+            list(encode_chunks(sample(), 10_000, {"delimiter": "auto"})),
+            [encode(sample(), {"delimiter": "auto"})],
+        )
+        self.assertEqual(list(encode_chunks("x", 10)), ["x"])
+        self.assertEqual(list(encode_chunks({}, 10)), [])
+
+    def test_chunks_respect_limit_and_repeat_paths(self):
+        for limit in (60, 100, 250):
+            chunks = list(encode_chunks(sample(), limit))
+            self.assertGreater(len(chunks), 1)
+            for chunk in chunks:
+                self.assertLessEqual(len(chunk), limit)
+                self.assertNotEqual(chunk, "")
+
+        chunks = list(encode_chunks(sample(), 120))
+        self.assertTrue(chunks[0].startswith("meta:\n  name: export\n  tags[2]: a,b\n  deep:\n    rows["))
+        self.assertTrue(chunks[1].startswith("meta:\n  deep:\n    rows["))
+        self.assertEqual(chunks[-1].split("\n")[-1], "tail: end")
+
+    def test_slice_headers_count_their_rows(self):
+        rows = [{"id": i, "name": f"user {i}"} for i in range(40)]
+        chunks = list(encode_chunks({"rows": rows}, 80, {"delimiter": "|", "length_marker": "#"}))
+        seen = []
+        for chunk in chunks:
+            header, *lines = chunk.split("\n")
+            self.assertEqual(header, f"rows[#{len(lines)}|]{{id|name}}:")
+            seen.extend(line.strip() for line in lines)
+        self.assertEqual(seen, [f"{i}|user {i}" for i in range(40)])
+
+        grid = [[i, i / 2] for i in range(30)]
+        chunks = list(encode_chunks({"grid": grid}, 60, {"matrix_arrays": True}))
+        self.assertGreater(len(chunks), 1)
+        seen = []
+        for chunk in chunks:
+            header, *lines = chunk.split("\n")
+            self.assertEqual(header, f"grid[{len(lines)}][2]:")
+            seen.extend(line.strip() for line in lines)
+        self.assertEqual("\n".join(seen), encode(grid, {"matrix_arrays": True, "indent": 0}).split("\n", 1)[1])
+
+    def test_nesting_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 100
+        value = {"rows": [{"id": 1}, {"id": 2}], "tail": "end"}
+        for _ in range(depth):
+            value = {"k": value}
+        self.assertEqual(list(encode_chunks(value, 10**9)), [encode(value)])
+        chunks = list(encode_chunks(value, len(encode(value)) - 1))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[1].endswith("tail: end"))
+
+    def test_root_array_and_list_items(self):
+        value = [{"id": 1}, {"id": 2, "x": True}, 3, [4, 5]]
+        chunks = list(encode_chunks(value, 30, Encoder()))
+        self.assertEqual(chunks, ["[1]:\n  - id: 1", "[1]:\n  - id: 2\n    x: true", "[2]:\n  - 3\n  - [2]: 4,5"])
+
+    def test_oversized_item_raises(self):
+        with self.assertRaises(ValueError):
+            list(encode_chunks({"rows": [{"text": "x" * 50}]}, 30))
+        with self.assertRaises(ValueError):
+            list(encode_chunks({"text": "x" * 50}, 30))
+        with self.assertRaises(ValueError):
+            list(encode_chunks({}, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
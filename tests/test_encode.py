@@ -1,10 +1,16 @@
+import copy
+import enum
 import pathlib
 import sys
 import unittest
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
-from toon import DELIMITERS, encode
+from toon import DELIMITERS, Encoder, Schema, SchemaError, TabularArray, encode, register_type
+from toon.encoders import detect_tabular_header, is_tabular_array
 
 
 class EncodeTests(unittest.TestCase):
@@ -402,6 +408,417 @@ class EncodeTests(unittest.TestCase):
             "tags[3]: reading,gaming,coding",
         )
 
+    def test_sparse_tabular(self):
+        obj = {
+            "orders": [
+                {"id": 1, "status": "open"},
+                {"id": 2, "status": "shipped", "orderDate": "2025-01-02"},
+                {"status": "a,b", "id": 3},
+            ]
+        }
+        self.assertEqual(
+            encode(obj, {"sparse_tabular": True}),
+            'orders[3]{id,status,orderDate}:\n'
+            "  1,open,null\n"
+            "  2,shipped,2025-01-02\n"
+            '  3,"a,b",null',
+        )
+        self.assertEqual(
+            encode(obj, {"sparse_tabular": True, "delimiter": "|"}),
+            "orders[3|]{id|status|orderDate}:\n"
+            "  1|open|null\n"
+            "  2|shipped|2025-01-02\n"
+            "  3|a,b|null",
+        )
+        self.assertTrue(encode(obj).startswith("orders[3]:\n  - id: 1"))
+        nested = {"items": [{"id": 1}, {"id": 2, "meta": {"x": 1}}]}
+        self.assertEqual(encode(nested, {"sparse_tabular": True}), encode(nested))
+        self.assertEqual(
+            encode({"items": [{"id": 1}, {"id": 2}]}, {"sparse_tabular": True}),
+            "items[2]{id}:\n  1\n  2",
+        )
+        scattered = {"items": [{f"k{i}": i} for i in range(6)]}
+        self.assertEqual(encode(scattered, {"sparse_tabular": True}), encode(scattered))
+        self.assertEqual(
+            encode({"items": [{}, {"a": 1}, {"a": 2}]}, {"sparse_tabular": True}),
+            "items[3]{a}:\n  null\n  1\n  2",
+        )
+        self.assertEqual(encode({"items": [{}, {}]}, {"sparse_tabular": True}), "items[2]:\n  -\n  -")
+
+    def test_flattened_tabular(self):
+        obj = {
+            "orders": [
+                {"id": 1, "customer": {"id": 7, "name": "Ada"}, "total": 9.5},
+                {"id": 2, "customer": {"id": 8, "name": "Bob"}, "total": 3},
+            ]
+        }
+        self.assertEqual(
+            encode(obj, {"flatten_depth": 1}),
+            "orders[2]{id,customer.id,customer.name,total}:\n  1,7,Ada,9.5\n  2,8,Bob,3",
+        )
+        self.assertTrue(encode(obj).startswith("orders[2]:\n  - id: 1"))
+        deep = {"rows": [{"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 2}}}]}
+        self.assertEqual(encode(deep, {"flatten_depth": 1}), encode(deep))
+        self.assertEqual(encode(deep, {"flatten_depth": 2}), "rows[2]{a.b.c}:\n  1\n  2")
+        self.assertEqual(
+            encode({"items": [{"x": {"y": 1}}]}, {"flatten_depth": 1}),
+            "items[1]{x.y}:\n  1",
+        )
+        ambiguous = {"rows": [{"a.b": 1, "a": {"c": 2}}]}
+        self.assertEqual(encode(ambiguous, {"flatten_depth": 1}), encode(ambiguous))
+        empty_nested = {"rows": [{"id": 1, "meta": {}}]}
+        self.assertEqual(encode(empty_nested, {"flatten_depth": 1}), encode(empty_nested))
+        sparse = {"rows": [{"id": 1, "c": {"x": 1}}, {"id": 2}]}
+        self.assertEqual(
+            encode(sparse, {"flatten_depth": 1, "sparse_tabular": True}),
+            "rows[2]{id,c.x}:\n  1,1\n  2,null",
+        )
+        self.assertEqual(
+            encode({"items": [{"list": [{"a": {"b": 1}}, {"a": {"b": 2}}], "n": 1}]}, {"flatten_depth": 1}),
+            "items[1]:\n  - list[2]{a.b}:\n    1\n    2\n    n: 1",
+        )
+        with self.assertRaises(ValueError):
+            encode({}, {"flatten_depth": -1})
+
+    def test_tabular_column_quoting(self):
+        rows = [
+            {"name": "plain", "note": "ok", "n": 1},
+            {"name": "with space", "note": "a,b", "n": 2},
+            {"name": "x", "note": "", "n": -3},
+            {"name": "y", "note": "line\nbreak", "n": 4},
+            {"name": "z", "note": " pad", "n": 5},
+            {"name": "w", "note": "true", "n": 6},
+        ]
+        self.assertEqual(
+            encode({"rows": rows}),
+            "rows[6]{name,note,n}:\n"
+            "  plain,ok,1\n"
+            '  with space,"a,b",2\n'
+            '  x,"",-3\n'
+            '  y,"line\\nbreak",4\n'
+            '  z," pad",5\n'
+            '  w,"true",6',
+        )
+        self.assertEqual(
+            encode({"rows": [{"a": "x|y", "b": "1.5"}, {"a": "ok", "b": "- x"}]}, {"delimiter": "|"}),
+            'rows[2|]{a|b}:\n  "x|y"|"1.5"\n  ok|"- x"',
+        )
+        self.assertEqual(
+            encode({"rows": [{"a": "x", "b": 1}, {"a": None, "b": 2.5}, {"a": True, "b": False}]}),
+            "rows[3]{a,b}:\n  x,1\n  null,2.5\n  true,false",
+        )
+
+    def test_tabular_detection_helpers(self):
+        rows = [{"id": 1, "name": "a"}, {"name": "b", "id": 2}]
+        self.assertEqual(detect_tabular_header(rows), ["id", "name"])
+        self.assertIsNone(detect_tabular_header(rows + [{"id": 3}]))
+        self.assertIsNone(detect_tabular_header([{}]))
+        self.assertTrue(is_tabular_array(rows, ["name", "id"]))
+        self.assertFalse(is_tabular_array(rows, ["id"]))
+        self.assertFalse(is_tabular_array([{"id": [1]}], ["id"]))
+        self.assertTrue(is_tabular_array([], ["id"]))
+        self.assertTrue(is_tabular_array([{}, {}], []))
+
+    def test_tabular_fallback_on_later_rows(self):
+        rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+        expanded = "  - id: 1\n    name: a\n  - id: 2\n    name: b\n"
+        self.assertEqual(
+            encode({"rows": rows + [{"id": 3, "label": "c"}]}),
+            "rows[3]:\n" + expanded + "  - id: 3\n    label: c",
+        )
+        self.assertEqual(
+            encode({"rows": rows + [{"id": 3}]}),
+            "rows[3]:\n" + expanded + "  - id: 3",
+        )
+        self.assertEqual(
+            encode({"rows": rows + [{"id": 3, "name": [1, 2]}]}),
+            "rows[3]:\n" + expanded + "  - id: 3\n    name[2]: 1,2",
+        )
+        self.assertEqual(
+            encode([{"rows": rows + [{"id": 3, "name": {"x": 1}}]}]),
+            "[1]:\n"
+            "  - rows[3]:\n"
+            "    - id: 1\n"
+            "      name: a\n"
+            "    - id: 2\n"
+            "      name: b\n"
+            "    - id: 3\n"
+            "      name:\n"
+            "        x: 1",
+        )
+
+    def test_type_normalization(self):
+        class Color(enum.Enum):
+            RED = "red"
+
+        class Level(enum.IntEnum):
+            HIGH = 3
+
+        value = {
+            "price": Decimal("9.50"),
+            "count": Decimal("3"),
+            "nan": Decimal("NaN"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "color": Color.RED,
+            "level": Level.HIGH,
+            "blob": b"hi!",
+            "wait": timedelta(minutes=1, milliseconds=500),
+            "at": time(9, 30),
+            "day": date(2025, 1, 2),
+            "when": datetime(2025, 1, 2, 3, 4, 5),
+            "pair": (1, 2),
+            "gen": (x for x in []),
+        }
+        self.assertEqual(
+            encode(value),
+            "price: 9.5\n"
+            "count: 3\n"
+            "nan: null\n"
+            "id: 12345678-1234-5678-1234-567812345678\n"
+            "color: red\n"
+            "level: 3\n"
+            "blob: aGkh\n"
+            "wait: 60.5\n"
+            'at: "09:30:00"\n'
+            "day: 2025-01-02\n"
+            'when: "2025-01-02T03:04:05"\n'
+            "pair[2]: 1,2\n"
+            "gen: null",
+        )
+
+    def test_registered_types_and_default_hook(self):
+        class Point:
+            __slots__ = ("x", "y")
+
+            def __init__(self, x, y):
+                self.x = x
+                self.y = y
+
+        class Point3(Point):
+            __slots__ = ("z",)
+
+        self.assertEqual(encode({"p": Point(1, 2)}), "p: null")
+        self.assertEqual(
+            encode({"p": Point(1, 2)}, {"default": lambda obj: {"x": obj.x, "y": obj.y}}),
+            "p:\n  x: 1\n  y: 2",
+        )
+        register_type(Point, lambda obj: [obj.x, obj.y])
+        self.assertEqual(encode({"p": Point(1, 2)}), "p[2]: 1,2")
+        self.assertEqual(encode({"p": Point3(1, 2)}), "p[2]: 1,2")
+
+        class Labelled(enum.Enum):
+            pass
+
+        class Size(Labelled):
+            SMALL = 1
+
+        class Tagged:
+            pass
+
+        class Mode(Tagged, enum.Enum):
+            FAST = 2
+
+        class Mixed(str, enum.Enum):
+            A = "a"
+
+        register_type(Labelled, lambda member: member.name.lower())
+        register_type(Tagged, lambda member: f"mode-{member.value}")
+        self.assertEqual(encode([Size.SMALL, Mode.FAST, Mixed.A]), "[3]: small,mode-2,a")
+        with self.assertRaises(TypeError):
+            encode({}, {"default": 5})
+
+    def test_schema_hints(self):
+        rows = [{"id": 1, "name": "Ada", "score": 9.5}, {"id": 2, "name": "a,b", "score": None}]
+        expected = 'users[2]{id,name,score}:\n  1,Ada,9.5\n  2,"a,b",null'
+        schema = Schema(["id", "name", "score"], {"id": int, "name": str, "score": (float, None)})
+        self.assertEqual(encode({"users": TabularArray(rows, schema)}), expected)
+        self.assertEqual(encode({"users": rows}, {"schemas": {"users": schema}}), expected)
+        self.assertEqual(
+            encode({"data": {"users": rows}}, {"schemas": {"data.users": ["id", "name", "score"], "missing.path": ["x"]}}),
+            "data:\n  " + expected.replace("\n", "\n  "),
+        )
+        self.assertEqual(
+            encode(rows, {"schemas": {"": ["name", "id", "score"]}}),
+            '[2]{name,id,score}:\n  Ada,1,9.5\n  "a,b",2,null',
+        )
+        self.assertEqual(encode({"users": TabularArray([], ["id"])}), "users[0]:")
+        mixed = Schema(["id", "name", "score"], {"id": int, "name": str, "score": float})
+        self.assertEqual(
+            encode({"users": TabularArray([{"id": None, "name": None, "score": None}, {"id": True, "name": "a", "score": 1}], mixed)}),
+            "users[2]{id,name,score}:\n  null,null,null\n  true,a,1",
+        )
+        self.assertEqual(
+            encode({"items": [{"users": TabularArray(rows, schema), "n": 1}]}),
+            "items[1]:\n  - " + expected.replace("\n", "\n  ") + "\n    n: 1",
+        )
+
+    def test_schema_verification(self):
+        schema = Schema(["id", "name"], {"id": int})
+        checked = {"schemas": {"users": schema}, "verify_schemas": True}
+        self.assertEqual(encode({"users": [{"name": "x", "id": 1}]}, checked), "users[1]{id,name}:\n  1,x")
+        cases = [
+            ([{"id": 1, "name": "a"}, {"id": 2}], "row 1: missing field 'name'"),
+            ([{"id": 1, "name": "a", "x": 0}], "row 0: unexpected field 'x'"),
+            ([{"id": "1", "name": "a"}], "row 0, field 'id': expected int, got str"),
+            ([{"id": 1, "name": ["a"]}], "row 0, field 'name': expected a primitive, got list"),
+            ([1], "row 0: expected an object, got int"),
+            ([{"id": True, "name": "a"}], "row 0, field 'id': expected int, got bool"),
+        ]
+        for rows, message in cases:
+            with self.assertRaises(SchemaError) as context:
+                encode({"users": rows}, checked)
+            self.assertEqual(str(context.exception), message)
+        prices = {"schemas": {"items": Schema(["id", "price"], {"price": float})}, "verify_schemas": True}
+        self.assertEqual(
+            encode({"items": [{"id": 1, "price": 0.0}, {"id": 2, "price": 2.5}, {"id": 3, "price": -0.0}]}, prices),
+            "items[3]{id,price}:\n  1,0\n  2,2.5\n  3,0",
+        )
+        with self.assertRaises(SchemaError):
+            encode({"items": [{"id": 1, "price": False}]}, prices)
+        # Trusted rows are not checked, but nested cells still fail clearly.
+        self.assertEqual(encode({"u": TabularArray([{"a": 1, "b": 2}, {}], ["a"])}), "u[2]{a}:\n  1\n  null")
+        with self.assertRaises(SchemaError) as context:
+            encode({"u": TabularArray([{"a": 1}, {"a": {"x": 1}}], ["a"])})
+        self.assertEqual(str(context.exception), "field 'a': expected a primitive, got dict; enable verify_schemas to find the row")
+        with self.assertRaises(ValueError):
+            Schema(["a", "a"])
+        with self.assertRaises(ValueError):
+            Schema(["a"], {"b": int})
+
+    def test_auto_delimiter(self):
+        self.assertEqual(encode({"tags": ["a", "b"]}, {"delimiter": "auto"}), "tags[2]: a,b")
+        self.assertEqual(
+            encode({"notes": ["a, b", "c, d"], "n": [1]}, {"delimiter": "auto"}),
+            "notes[2\t]: a, b\tc, d\nn[1\t]: 1",
+        )
+        self.assertEqual(
+            encode({"notes": ["a, b"], "n": [1], "m": [2]}, {"delimiter": "auto"}),
+            'notes[1]: "a, b"\nn[1]: 1\nm[1]: 2',
+        )
+        self.assertEqual(encode({"note": "a,b"}, {"delimiter": "auto"}), "note: a,b")
+        # Strings quoted for other reasons do not count towards the choice.
+        self.assertEqual(encode({"xs": ['x: a,b', "y"]}, {"delimiter": "auto"}), 'xs[2]: "x: a,b",y')
+        rows = [{"id": i, "text": f"hello, {i}"} for i in range(3)]
+        self.assertEqual(
+            encode({"rows": rows}, {"delimiter": "auto"}),
+            encode({"rows": rows}, {"delimiter": "\t"}),
+        )
+        # Headers written without a delimiter suffix do not count either.
+        grid = {"grid": [["a,b", "c"], ["d", "e"], ["f", "g"]]}
+        self.assertEqual(
+            encode(grid, {"delimiter": "auto", "matrix_arrays": True}),
+            encode(grid, {"delimiter": "\t", "matrix_arrays": True}),
+        )
+        items = [{"xs": [{"a": 1}, {"b": 2}], "k": "a,b"}]
+        self.assertEqual(encode(items, {"delimiter": "auto"}), encode(items, {"delimiter": "\t"}))
+        self.assertEqual(Encoder({"delimiter": "auto"}).options.delimiter, "auto")
+
+    def test_reusable_encoder(self):
+        encoder = Encoder({"delimiter": "|", "indent": 4})
+        obj = {"items": [{"a": 1, "b": "x|y"}, {"a": 2, "b": "z"}], "user": {"tags": ["a", "b"]}}
+        expected = encode(obj, {"delimiter": "|", "indent": 4})
+        self.assertEqual(encoder.encode(obj), expected)
+        self.assertEqual(encoder(obj), expected)
+        self.assertEqual(encoder.options.delimiter, "|")
+        self.assertEqual(Encoder().encode("true"), '"true"')
+        with self.assertRaises(ValueError):
+            Encoder({"indent": -1})
+
+    def test_deep_nesting_beyond_indent_table(self):
+        value = "leaf"
+        for _ in range(40):
+            value = {"k": value}
+        lines = encode(value).split("\n")
+        self.assertEqual(len(lines), 40)
+        self.assertEqual(lines[-1], " " * 78 + "k: leaf")
+
+    def test_nesting_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 500
+        value = "leaf"
+        for _ in range(depth):
+            value = {"k": value}
+        lines = encode(value, {"indent": 0}).split("\n")
+        self.assertEqual(len(lines), depth)
+        self.assertEqual(lines[-1], "k: leaf")
+
+        value = (1,)
+        for _ in range(depth):
+            value = (value, "x")
+        lines = encode(value, {"indent": 0}).split("\n")
+        self.assertEqual(lines[:4], ["[2]:", "-", "[2]:", "-"])
+        self.assertEqual(lines.count("- x"), depth)
+        self.assertEqual(lines[2 * depth - 1], "- [1]: 1")
+
+    def test_matrix_arrays(self):
+        value = {"grid": [[1, 2.5, 3], [4, 5, 1e-7]], "words": [["a", "b,c"], ["x", "y"]]}
+        self.assertEqual(
+            encode(value, {"matrix_arrays": True}),
+            'grid[2][3]:\n  1,2.5,3\n  4,5,1e-7\nwords[2][2]:\n  a,"b,c"\n  x,y',
+        )
+        self.assertEqual(
+            encode([[1, 2], [3, 4]], {"matrix_arrays": True, "delimiter": "|", "length_marker": "#"}),
+            "[#2|][#2]:\n  1|2\n  3|4",
+        )
+        # Ragged or empty rows keep the list form.
+        self.assertEqual(
+            encode({"rows": [[1], [1, 2]], "empty": [[], []]}, {"matrix_arrays": True}),
+            "rows[2]:\n  - [1]: 1\n  - [2]: 1,2\nempty[2]:\n  - [0]:\n  - [0]:",
+        )
+        self.assertEqual(encode(value), encode(value, {"matrix_arrays": False}))
+        self.assertIn("- [3]: 1,2.5,3", encode(value))
+        # The first field of a list item gets the same form.
+        self.assertEqual(
+            encode([{"g": [[1, 2], [3, 4]], "n": 1}], {"matrix_arrays": True}),
+            "[1]:\n  - g[2][2]:\n    1,2\n    3,4\n    n: 1",
+        )
+        self.assertEqual(
+            encode([{"g": [[1], [2, 3]], "n": 1}], {"matrix_arrays": True}),
+            "[1]:\n  - g[2]:\n    - [1]: 1\n    - [2]: 2,3\n    n: 1",
+        )
+
+    def test_shared_subtrees(self):
+        customer = {"id": 7, "address": {"city": "Paris"}, "tags": ["vip", "eu"]}
+        value = {
+            "orders": [{"id": index, "customer": customer} for index in range(3)],
+            "owner": customer,
+            "nested": {"owner": customer},
+        }
+        expected = encode(copy.deepcopy(value))
+        self.assertEqual(encode(value), expected)
+        self.assertEqual(expected.count("city: Paris"), 5)
+        chunks = []
+        Encoder().stream(value, chunks.append, chunk_lines=2)
+        self.assertEqual("".join(chunks), expected)
+
+        # A schema applies at its path only, not everywhere the object occurs.
+        rows = [{"a": 1}, {"a": 2, "b": 3}]
+        group = {"rows": rows}
+        encoded = encode({"first": group, "second": group}, {"schemas": {"first.rows": ["a", "b"]}})
+        self.assertEqual(
+            encoded,
+            "first:\n  rows[2]{a,b}:\n    1,null\n    2,3\n"
+            "second:\n  rows[2]:\n    - a: 1\n    - a: 2\n      b: 3",
+        )
+        self.assertEqual(group, {"rows": rows})
+
+    def test_circular_references(self):
+        value = {"id": 1}
+        value["self"] = value
+        with self.assertRaisesRegex(ValueError, "Circular reference detected: dict"):
+            encode(value)
+
+        items = [1]
+        items.append({"items": items})
+        with self.assertRaisesRegex(ValueError, "Circular reference detected: list"):
+            encode(items)
+
+        class Node:
+            def __init__(self):
+                self.child = self
+
+        with self.assertRaisesRegex(ValueError, "Circular reference detected: Node"):
+            encode(Node())
+
 
 if __name__ == "__main__":
     unittest.main()
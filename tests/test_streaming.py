@@ -0,0 +1,99 @@
+import bz2
+import gzip
+import hashlib
+import lzma
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from toon import Encoder, digest, encode, encode_to_file
+from toon.encoders import LineCache
+
+
+def sample(rows=3000):
+    return {
+        "meta": {"name": "export", "tags": ["a", "b,c"]},
+        "rows": [{"id": i, "name": f"user {i}", "score": i / 7} for i in range(rows)],
+    }
+
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = pathlib.Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_stream_chunks_join_to_encode(self):
+        chunks = []
+        Encoder().stream(sample(), chunks.append, chunk_lines=100)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), encode(sample()))
+
+        chunks = []
+        Encoder().stream("true", chunks.append)
+        self.assertEqual(chunks, ['"true"'])
+
+    def test_stream_bounds_reused_lines(self):
+        customers = [{"id": i, "tags": ["a", "b"], "address": {"city": f"c{i}"}} for i in range(50)]
+        value = {"orders": [{"n": i, "customer": customers[i % 50]} for i in range(200)], "first": customers[0]}
+        chunks = []
+        Encoder().stream(value, chunks.append, chunk_lines=8)
+        self.assertEqual("".join(chunks), encode(value))
+
+        cache = LineCache(4)
+        cache.add((1, 0, None), ["a", "b", "c"])
+        cache.add((2, 0, None), ["d", "e"])
+        self.assertEqual(cache.get((1, 0, None)), ["a", "b", "c"])
+        self.assertIsNone(cache.get((2, 0, None)))
+
+    def test_encode_to_file_infers_compression(self):
+        expected = encode(sample(), {"delimiter": "\t"})
+        for name, opener in (("out.toon.gz", gzip.open), ("out.toon.bz2", bz2.open), ("out.toon.xz", lzma.open)):
+            path = self.dir / name
+            encode_to_file(sample(), path, {"delimiter": "\t"})
+            with opener(path, "rt", encoding="utf-8", newline="") as handle:
+                self.assertEqual(handle.read(), expected)
+
+        path = self.dir / "out.toon"
+        encode_to_file(sample(), path, {"delimiter": "\t"})
+        self.assertEqual(path.read_text(encoding="utf-8"), expected)
+
+    def test_encode_to_file_explicit_compression(self):
+        path = self.dir / "out.bin"
+        encode_to_file(sample(), path, Encoder(), compression="gzip")
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            self.assertEqual(handle.read(), encode(sample()))
+
+        path = self.dir / "plain.gz"
+        encode_to_file({"a": 1}, path, compression=None)
+        self.assertEqual(path.read_text(), "a: 1")
+
+        with self.assertRaises(ValueError):
+            encode_to_file({"a": 1}, self.dir / "x", compression="zip")
+
+    def test_encode_to_file_propagates_writer_errors(self):
+        path = self.dir / "missing" / "out.gz"
+        with self.assertRaises(OSError):
+            encode_to_file(sample(), path)
+
+    def test_digest_matches_hash_of_encode(self):
+        text = encode(sample())
+        self.assertEqual(digest(sample()), hashlib.sha256(text.encode("utf-8")).hexdigest())
+        self.assertEqual(digest(sample(), algorithm="md5"), hashlib.md5(text.encode("utf-8")).hexdigest())
+
+        options = {"delimiter": "|", "indent": 4}
+        expected = hashlib.blake2b(encode({"name": "café"}, options).encode("utf-16-le")).hexdigest()
+        self.assertEqual(digest({"name": "café"}, Encoder(options), "blake2b", encoding="utf-16-le"), expected)
+        self.assertEqual(digest(None), hashlib.sha256(b"null").hexdigest())
+
+        with self.assertRaises(ValueError):
+            digest(sample(), algorithm="no-such-hash")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,288 @@
+"""Split encoded output into self-contained TOON documents under a size limit."""
+
+from __future__ import annotations
+
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .encoder import Encoder, OptionsLike
+from .encoders import (
+    encode_key_value_pair,
+    encode_list_item,
+    matrix_width,
+    plan_tabular,
+    write_matrix_rows,
+    write_tabular_rows,
+    write_value,
+)
+from .normalize import is_array_of_arrays, is_array_of_objects, is_array_of_primitives, is_json_array, is_json_object
+from .primitives import encode_key, format_header
+from .schema import TabularArray
+from .types import JsonArray, JsonObject, JsonValue, ResolvedEncodeOptions
+
+KeyPath = Tuple[str, ...]
+
+# Tabular rows are encoded in batches so column analysis still applies
+# without encoding a whole array up front.
+ROW_BATCH_SIZE = 512
+
+
+def encode_chunks(
+    value: Any,
+    max_chars: int,
+    options: Union[Encoder, OptionsLike] = None,
+) -> Iterator[str]:
+    """Encode ``value`` as a series of valid TOON documents of at most ``max_chars``.
+
+    Top-level fields are kept whole where possible. Arrays that are not
+    written inline are split between items; each piece gets a header with
+    its own length, and every document repeats the key path of its content.
+    Output is produced in a single pass. Raises ``ValueError`` if a single
+    field, row or list item cannot fit within the limit.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+    encoder = options if isinstance(options, Encoder) else Encoder(options)
+    normalized, resolved, _ = encoder.prepare(value)
+    packer = _ChunkPacker(resolved, max_chars)
+    for unit in _iter_units(normalized, encoder, resolved):
+        if isinstance(unit, _ArrayUnit):
+            yield from packer.add_array(unit)
+        else:
+            yield from packer.add(*unit)
+    yield from packer.finish()
+
+
+class _ArrayUnit:
+    """An array that may be split between items across documents."""
+
+    __slots__ = ("path", "key", "fields", "width", "length", "items")
+
+    def __init__(
+        self,
+        path: KeyPath,
+        key: Optional[str],
+        fields: Optional[Sequence[str]],
+        length: int,
+        items: Iterator[List[str]],
+        width: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.key = key
+        self.fields = fields
+        self.width = width
+        self.length = length
+        self.items = items
+
+
+_Unit = Union[Tuple[KeyPath, List[str]], _ArrayUnit]
+
+
+def _iter_units(value: JsonValue, encoder: Encoder, options: ResolvedEncodeOptions) -> Iterator[_Unit]:
+    if is_json_object(value):
+        yield from _iter_object_units(value, (), encoder, options)
+    elif is_json_array(value) and _is_splittable(value):
+        yield _array_unit((), None, value, encoder, options)
+    else:
+        writer = encoder.writer()
+        write_value(value, writer, options)
+        yield (), writer.lines()
+
+
+def _iter_object_units(
+    value: JsonObject,
+    path: KeyPath,
+    encoder: Encoder,
+    options: ResolvedEncodeOptions,
+) -> Iterator[_Unit]:
+    # Nested objects are walked from an explicit stack, as in ``write_frames``,
+    # so nesting depth is not limited by the recursion limit.
+    stack = [(iter(value.items()), path)]
+    while stack:
+        entries, path = stack[-1]
+        for key, item in entries:
+            if is_json_object(item) and item:
+                stack.append((iter(item.items()), path + (key,)))
+                break
+            if is_json_array(item) and _is_splittable(item):
+                yield _array_unit(path, key, item, encoder, options)
+            else:
+                writer = encoder.writer()
+                encode_key_value_pair(key, item, writer, len(path), options)
+                yield path, writer.lines()
+        else:
+            stack.pop()
+
+
+def _is_splittable(value: JsonArray) -> bool:
+    return bool(value) and not is_array_of_primitives(value)
+
+
+def _array_unit(
+    path: KeyPath,
+    key: Optional[str],
+    value: JsonArray,
+    encoder: Encoder,
+    options: ResolvedEncodeOptions,
+) -> _ArrayUnit:
+    depth = len(path) + 1
+    tabular = None
+    if isinstance(value, TabularArray) or is_array_of_objects(value):
+        tabular = plan_tabular(value, options)
+    if tabular:
+        rows, fields, _ = tabular
+        return _ArrayUnit(path, key, fields, len(rows), _iter_tabular_rows(rows, fields, depth, encoder, options))
+    if options.matrix_arrays and is_array_of_arrays(value) and all(map(is_array_of_primitives, value)):
+        width = matrix_width(value)
+        if width:
+            rows = _iter_matrix_rows(value, width, depth, encoder, options)
+            return _ArrayUnit(path, key, None, len(value), rows, width)
+    return _ArrayUnit(path, key, None, len(value), _iter_list_items(value, depth, encoder, options))
+
+
+def _iter_tabular_rows(
+    rows: Sequence[JsonObject],
+    fields: Sequence[str],
+    depth: int,
+    encoder: Encoder,
+    options: ResolvedEncodeOptions,
+) -> Iterator[List[str]]:
+    schema = rows.schema if isinstance(rows, TabularArray) else None
+    for start in range(0, len(rows), ROW_BATCH_SIZE):
+        batch: Sequence[JsonObject] = rows[start:start + ROW_BATCH_SIZE]
+        if schema is not None:
+            batch = TabularArray(batch, schema)
+        writer = encoder.writer()
+        write_tabular_rows(batch, fields, writer, depth, options)
+        for line in writer.lines():
+            yield [line]
+
+
+def _iter_matrix_rows(
+    rows: JsonArray,
+    width: int,
+    depth: int,
+    encoder: Encoder,
+    options: ResolvedEncodeOptions,
+) -> Iterator[List[str]]:
+    for start in range(0, len(rows), ROW_BATCH_SIZE):
+        writer = encoder.writer()
+        write_matrix_rows(rows[start:start + ROW_BATCH_SIZE], width, writer, depth, options)
+        for line in writer.lines():
+            yield [line]
+
+
+def _iter_list_items(
+    items: JsonArray,
+    depth: int,
+    encoder: Encoder,
+    options: ResolvedEncodeOptions,
+) -> Iterator[List[str]]:
+    for item in items:
+        writer = encoder.writer()
+        encode_list_item(item, writer, depth, options)
+        yield writer.lines()
+
+
+class _ChunkPacker:
+    """Accumulates lines into documents, reopening key paths as needed."""
+
+    def __init__(self, options: ResolvedEncodeOptions, max_chars: int) -> None:
+        self._options = options
+        self._indent = " " * self._options.indent
+        self._max_chars = max_chars
+        self._lines: List[str] = []
+        self._size = 0
+        self._path: KeyPath = ()
+
+    def add(self, path: KeyPath, lines: List[str]) -> Iterator[str]:
+        opening = self._opening(path)
+        if self._lines and not self._fits(_measure(opening) + _measure(lines)):
+            yield self._take()
+            opening = self._opening(path)
+        if not self._fits(_measure(opening) + _measure(lines)):
+            raise ValueError(f"a field at {_describe(path)} does not fit within max_chars={self._max_chars}")
+        self._append(path, opening + lines)
+
+    def add_array(self, unit: _ArrayUnit) -> Iterator[str]:
+        path = unit.path
+        # Space is reserved for the header of the full array; a slice's
+        # header has a length with no more digits, so it always fits.
+        header_size = _measure([self._header(unit, unit.length)])
+        opening = self._opening(path)
+        reserved = _measure(opening) + header_size
+        items: List[str] = []
+        items_size = 0
+        count = 0
+        for lines in unit.items:
+            size = _measure(lines)
+            if not self._fits(reserved + items_size + size):
+                if count:
+                    self._append(path, opening + [self._header(unit, count)] + items)
+                    items, items_size, count = [], 0, 0
+                if self._lines:
+                    yield self._take()
+                opening = self._opening(path)
+                reserved = _measure(opening) + header_size
+                if not self._fits(reserved + size):
+                    raise ValueError(f"an item of {_describe(path, unit.key)} does not fit within max_chars={self._max_chars}")
+            items.extend(lines)
+            items_size += size
+            count += 1
+        if count:
+            self._append(path, opening + [self._header(unit, count)] + items)
+
+    def finish(self) -> Iterator[str]:
+        if self._lines:
+            yield self._take()
+
+    def _header(self, unit: _ArrayUnit, length: int) -> str:
+        options = self._options
+        header = format_header(
+            length,
+            key=unit.key,
+            fields=unit.fields,
+            width=unit.width,
+            delimiter=options.delimiter,
+            length_marker=options.length_marker,
+        )
+        return self._indent * len(unit.path) + header
+
+    def _opening(self, path: KeyPath) -> List[str]:
+        """Header lines for the objects on ``path`` not already open in this document."""
+        shared = 0
+        if self._lines:
+            for current, wanted in zip(self._path, path):
+                if current != wanted:
+                    break
+                shared += 1
+        return [f"{self._indent * depth}{encode_key(key)}:" for depth, key in enumerate(path[shared:], start=shared)]
+
+    def _fits(self, size: int) -> bool:
+        # ``size`` counts a newline per line; the first line of a document has none.
+        if not self._lines:
+            size -= 1
+        return self._size + size <= self._max_chars
+
+    def _append(self, path: KeyPath, lines: List[str]) -> None:
+        size = _measure(lines)
+        if not self._lines:
+            size -= 1
+        self._lines.extend(lines)
+        self._size += size
+        self._path = path
+
+    def _take(self) -> str:
+        chunk = "\n".join(self._lines)
+        self._lines = []
+        self._size = 0
+        self._path = ()
+        return chunk
+
+
+def _measure(lines: List[str]) -> int:
+    return sum(map(len, lines)) + len(lines)
+
+
+def _describe(path: KeyPath, key: Optional[str] = None) -> str:
+    keys = path + ((key,) if key is not None else ())
+    return ".".join(keys) if keys else "the root"
@@ -42,3 +42,6 @@ Delimiter = str
 
 DEFAULT_DELIMITER: Delimiter = DELIMITERS["comma"]
 
+# Chooses the delimiter per document from the strings it contains.
+AUTO_DELIMITER = "auto"
+
@@ -0,0 +1,91 @@
+"""Reusable encoder objects bound to a resolved set of options."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, is_dataclass, replace
+from typing import Any, Callable, FrozenSet, Mapping, Set, Tuple, Union
+
+from .constants import AUTO_DELIMITER
+from .encoders import choose_delimiter, write_value
+from .normalize import normalize_value
+from .schema import apply_schemas
+from .types import EncodeOptions, JsonValue, ResolvedEncodeOptions, resolve_options
+from .writer import DEFAULT_CHUNK_LINES, LineWriter, StreamWriter, build_indent_table
+
+OptionsLike = Union[EncodeOptions, Mapping[str, Any], None]
+
+
+class Encoder:
+    """Encode Python values to TOON with a fixed configuration.
+
+    Options are resolved and validated once, and the indentation prefixes for
+    each depth are precomputed, so a single instance can be built per
+    configuration and called repeatedly. Instances hold no per-call state and
+    are safe to share across threads.
+    """
+
+    __slots__ = ("_options", "_indents")
+
+    def __init__(self, options: OptionsLike = None) -> None:
+        self._options = resolve(options)
+        self._indents = build_indent_table(self._options.indent)
+
+    @property
+    def options(self) -> ResolvedEncodeOptions:
+        return self._options
+
+    def encode(self, value: Any) -> str:
+        """Encode ``value`` into a TOON string."""
+        normalized, options, shared = self.prepare(value)
+        writer = self.writer()
+        write_value(normalized, writer, options, shared)
+        return writer.to_string()
+
+    __call__ = encode
+
+    def stream(self, value: Any, sink: Callable[[str], object], chunk_lines: int = DEFAULT_CHUNK_LINES) -> None:
+        """Encode ``value`` and pass the output to ``sink`` in chunks of lines.
+
+        Concatenating the chunks gives the same text as :meth:`encode`; the
+        full document is never held in memory at once.
+        """
+        normalized, options, shared = self.prepare(value)
+        writer = StreamWriter(options.indent, sink, self._indents, chunk_lines)
+        write_value(normalized, writer, options, shared)
+        writer.flush()
+
+    def writer(self) -> LineWriter:
+        """Return a fresh writer sharing this encoder's indentation table."""
+        return LineWriter(self._options.indent, self._indents)
+
+    def prepare(self, value: Any) -> Tuple[JsonValue, ResolvedEncodeOptions, FrozenSet[int]]:
+        """Normalize ``value`` and return it with the options to encode it with.
+
+        The options differ from :attr:`options` only when they depend on the
+        value, as with ``delimiter="auto"``. The last item holds the ids of
+        containers that occur more than once in the normalized value.
+        """
+        options = self._options
+        shared: Set[int] = set()
+        normalized = normalize_value(value, options.default, shared)
+        if options.schemas:
+            normalized = apply_schemas(normalized, options.schemas, shared)
+        if options.delimiter == AUTO_DELIMITER:
+            options = replace(options, delimiter=choose_delimiter(normalized, options))
+        return normalized, options, frozenset(shared)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._options!r})"
+
+
+def resolve(options: OptionsLike) -> ResolvedEncodeOptions:
+    """Resolve user-supplied options (dataclass, mapping or ``None``)."""
+    if options is None:
+        return resolve_options(None)
+    if isinstance(options, EncodeOptions):
+        return resolve_options(options)
+    if is_dataclass(options):
+        return resolve_options(EncodeOptions(**asdict(options)))
+    if isinstance(options, Mapping):
+        return resolve_options(EncodeOptions(**dict(options)))
+    raise TypeError("options must be an EncodeOptions instance, mapping, or None")
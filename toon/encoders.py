@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List, Sequence
+from operator import itemgetter
+from typing import AbstractSet, Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from .constants import LIST_ITEM_MARKER, LIST_ITEM_PREFIX
+from .constants import COMMA, DOUBLE_QUOTE, LIST_ITEM_MARKER, LIST_ITEM_PREFIX, PIPE, TAB, Delimiter
 from .normalize import (
+    PRIMITIVE_TYPES,
     is_array_of_arrays,
     is_array_of_objects,
     is_array_of_primitives,
@@ -14,11 +16,14 @@ from .normalize import (
     is_json_primitive,
 )
 from .primitives import (
+    encode_column,
     encode_key,
     encode_primitive,
     format_header,
+    is_safe_unquoted,
     join_encoded_values,
 )
+from .schema import SchemaError, TabularArray, verify_schema
 from .types import Depth, JsonArray, JsonObject, JsonPrimitive, JsonValue, ResolvedEncodeOptions
 from .writer import LineWriter
 
@@ -28,33 +33,150 @@ def encode_value(value: JsonValue, options: ResolvedEncodeOptions) -> str:
         return encode_primitive(value, options.delimiter)
 
     writer = LineWriter(options.indent)
+    write_value(value, writer, options)
+    return writer.to_string()
 
-    if is_json_array(value):
-        encode_array(None, value, writer, 0, options)
-    elif is_json_object(value):
-        encode_object(value, writer, 0, options)
 
-    return writer.to_string()
+def write_value(
+    value: JsonValue,
+    writer: LineWriter,
+    options: ResolvedEncodeOptions,
+    shared: AbstractSet[int] = frozenset(),
+) -> None:
+    """Encode a normalized value into ``writer`` starting at depth zero.
+
+    ``shared`` holds the ids of containers that occur more than once in
+    ``value``; their lines are encoded once per depth and then copied.
+    """
+    if is_json_primitive(value):
+        writer.push(0, encode_primitive(value, options.delimiter))
+    elif is_json_array(value):
+        frame = write_array(None, value, writer, 0, options)
+        if frame is not None:
+            write_frames([frame], writer, options, shared)
+    elif is_json_object(value):
+        write_frames([(_FIELDS, iter(value.items()), 0)], writer, options, shared)
+
+
+def choose_delimiter(value: JsonValue, options: ResolvedEncodeOptions) -> Delimiter:
+    """Pick the delimiter that gives the shortest output for ``value``.
+
+    Comma and pipe force quotes around strings that contain them and are
+    otherwise safe; tab never does (tabs are always escaped), but is written
+    into array headers. Only headers written with a delimiter suffix are
+    counted, and only strings that are written at all. Ties go to comma,
+    then tab.
+    """
+    headers = 0
+    quoted = {COMMA: 0, PIPE: 0}
+    # A tuple ``(items, first_field)`` stands for the items of an array
+    # written as list items, whose header has already been counted;
+    # normalized values are never tuples.
+    stack: List[Any] = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            has_comma = COMMA in item
+            has_pipe = PIPE in item
+            if (has_comma or has_pipe) and is_safe_unquoted(item, ""):
+                quoted[COMMA] += has_comma
+                quoted[PIPE] += has_pipe
+        elif isinstance(item, list):
+            headers += 1
+            if options.matrix_arrays and _is_matrix(item):
+                # Rows of a matrix are written without headers.
+                for row in item:
+                    stack.extend(row)
+            else:
+                stack.append((item, False))
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, tuple):
+            entries, first_field = item
+            for entry in entries:
+                if isinstance(entry, dict) and entry:
+                    fields = iter(entry.values())
+                    first = next(fields)
+                    if isinstance(first, list) and not _has_delimited_header(first, options):
+                        # Written as ``key[N]:`` with no delimiter suffix.
+                        stack.extend(fields)
+                        stack.append((first, not is_array_of_objects(first)))
+                        continue
+                elif first_field and isinstance(entry, list) and not is_array_of_primitives(entry):
+                    # Skipped when encoding a list item's first field.
+                    continue
+                stack.append(entry)
+
+    quote_cost = 2 * len(DOUBLE_QUOTE)
+    costs = {
+        COMMA: quote_cost * quoted[COMMA],
+        TAB: headers,
+        PIPE: headers + quote_cost * quoted[PIPE],
+    }
+    return min(costs, key=costs.__getitem__)
+
+
+def _is_matrix(value: JsonArray) -> bool:
+    return bool(value) and is_array_of_arrays(value) and all(map(is_array_of_primitives, value)) and matrix_width(value) is not None
+
+
+def _has_delimited_header(value: JsonArray, options: ResolvedEncodeOptions) -> bool:
+    """Whether ``value`` as the first field of a list item gets a header with a delimiter suffix."""
+    if is_array_of_primitives(value) or (options.matrix_arrays and _is_matrix(value)):
+        return True
+    return is_array_of_objects(value) and (isinstance(value, TabularArray) or plan_tabular(value, options) is not None)
+
+
+# Nested containers are written from an explicit work stack rather than by
+# recursion, so the depth of a document is not limited by the interpreter's
+# recursion limit. Each frame is ``(kind, entries, depth)``: ``_FIELDS``
+# frames iterate over the ``(key, value)`` pairs of an object, ``_ITEMS``
+# frames over the items of a list. A frame is suspended while a nested
+# container is written and resumed afterwards, so the stack grows with the
+# nesting depth only. ``_FIRST_FIELD_ITEMS`` frames hold the items of a
+# mixed array that is the first field of a list item, where nested arrays
+# that are not primitive are skipped. A ``_RECORD`` frame sits below the
+# frames of a shared container and saves its lines once they are written.
+_FIELDS = 0
+_ITEMS = 1
+_FIRST_FIELD_ITEMS = 2
+_RECORD = 3
+
+Frame = Tuple[int, Any, Depth]
+
+CacheKey = Tuple[int, Depth, Optional[str]]
+
+
+class LineCache:
+    """Encoded lines of shared containers by id, depth and field key (``None`` for list items).
+
+    At most ``limit`` lines are kept; recordings that do not fit are
+    dropped and their containers are encoded again where they reappear.
+    """
+
+    __slots__ = ("_lines", "_room")
+
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self._lines: Dict[CacheKey, List[str]] = {}
+        self._room = limit
+
+    def get(self, key: CacheKey) -> Optional[List[str]]:
+        return self._lines.get(key)
+
+    def add(self, key: CacheKey, lines: List[str]) -> None:
+        if self._room is not None:
+            if len(lines) > self._room:
+                return
+            self._room -= len(lines)
+        self._lines[key] = lines
 
 
 def encode_object(value: JsonObject, writer: LineWriter, depth: Depth, options: ResolvedEncodeOptions) -> None:
-    for key, item in value.items():
-        encode_key_value_pair(key, item, writer, depth, options)
+    write_frames([(_FIELDS, iter(value.items()), depth)], writer, options)
 
 
 def encode_key_value_pair(key: str, value: JsonValue, writer: LineWriter, depth: Depth, options: ResolvedEncodeOptions) -> None:
-    encoded_key = encode_key(key)
-
-    if is_json_primitive(value):
-        writer.push(depth, f"{encoded_key}: {encode_primitive(value, options.delimiter)}")
-    elif is_json_array(value):
-        encode_array(key, value, writer, depth, options)
-    elif is_json_object(value):
-        if not value:
-            writer.push(depth, f"{encoded_key}:")
-        else:
-            writer.push(depth, f"{encoded_key}:")
-            encode_object(value, writer, depth + 1, options)
+    write_frames([(_FIELDS, iter(((key, value),)), depth)], writer, options)
 
 
 def encode_array(
@@ -64,27 +186,130 @@ def encode_array(
     depth: Depth,
     options: ResolvedEncodeOptions,
 ) -> None:
+    frame = write_array(key, value, writer, depth, options)
+    if frame is not None:
+        write_frames([frame], writer, options)
+
+
+def write_frames(
+    stack: List[Frame],
+    writer: LineWriter,
+    options: ResolvedEncodeOptions,
+    shared: AbstractSet[int] = frozenset(),
+) -> None:
+    """Write the entries of every frame on ``stack`` in document order."""
+    push = writer.push
+    delimiter = options.delimiter
+    cache = LineCache(writer.cache_limit)
+    while stack:
+        frame = stack.pop()
+        kind, entries, depth = frame
+        if kind == _FIELDS:
+            for key, value in entries:
+                if value is None or isinstance(value, (str, int, float)):
+                    push(depth, f"{encode_key(key)}: {encode_primitive(value, delimiter)}")
+                    continue
+                record = None
+                if shared and id(value) in shared:
+                    record = _start_record(cache, (id(value), depth, key), writer)
+                    if record is None:
+                        continue
+                if isinstance(value, list):
+                    child = write_array(key, value, writer, depth, options)
+                else:
+                    push(depth, f"{encode_key(key)}:")
+                    child = (_FIELDS, iter(value.items()), depth + 1) if value else None
+                if child is None:
+                    if record is not None:
+                        _finish_record(cache, record, writer)
+                    continue
+                stack.append(frame)
+                if record is not None:
+                    stack.append(record)
+                stack.append(child)
+                break
+        elif kind == _RECORD:
+            _finish_record(cache, frame, writer)
+        else:
+            first_field = kind == _FIRST_FIELD_ITEMS
+            for item in entries:
+                record = None
+                if shared and id(item) in shared and not first_field:
+                    record = _start_record(cache, (id(item), depth, None), writer)
+                    if record is None:
+                        continue
+                if isinstance(item, dict):
+                    children = write_object_list_item(item, writer, depth, options)
+                else:
+                    children = write_list_item(item, writer, depth, options, first_field)
+                if not children:
+                    if record is not None:
+                        _finish_record(cache, record, writer)
+                    continue
+                stack.append(frame)
+                if record is not None:
+                    stack.append(record)
+                stack.extend(children)
+                break
+
+
+def _start_record(cache: LineCache, cache_key: CacheKey, writer: LineWriter) -> Frame | None:
+    """Copy the cached lines for ``cache_key`` and return ``None``, or return a frame to record them."""
+    lines = cache.get(cache_key)
+    if lines is not None:
+        writer.extend(lines)
+        return None
+    return (_RECORD, (cache_key, writer.mark()), cache_key[1])
+
+
+def _finish_record(cache: LineCache, record: Frame, writer: LineWriter) -> None:
+    cache_key, mark = record[1]
+    lines = writer.lines_since(mark)
+    if lines is not None:
+        cache.add(cache_key, lines)
+
+
+def write_array(
+    key: str | None,
+    value: JsonArray,
+    writer: LineWriter,
+    depth: Depth,
+    options: ResolvedEncodeOptions,
+) -> Frame | None:
+    """Write ``value`` if it needs no nesting; otherwise write its header and return a frame for its items."""
     if not value:
         header = format_header(len(value), key=key, delimiter=options.delimiter, length_marker=options.length_marker)
         writer.push(depth, header)
-        return
+        return None
+
+    if isinstance(value, TabularArray):
+        rows, header, columns = plan_tabular(value, options)
+        encode_array_of_objects_as_tabular(key, rows, header, writer, depth, options, columns)
+        return None
 
     if is_array_of_primitives(value):
         encode_inline_primitive_array(key, value, writer, depth, options)
-        return
+        return None
 
     if is_array_of_arrays(value):
         if all(is_array_of_primitives(arr) for arr in value):
-            encode_array_of_arrays_as_list_items(key, value, writer, depth, options)
-            return
+            width = matrix_width(value) if options.matrix_arrays else None
+            if width:
+                encode_array_of_arrays_as_matrix(key, value, width, writer, depth, options)
+            else:
+                encode_array_of_arrays_as_list_items(key, value, writer, depth, options)
+            return None
 
     if is_array_of_objects(value):
-        header = detect_tabular_header(value)
-        if header:
-            encode_array_of_objects_as_tabular(key, value, header, writer, depth, options)
-            return
+        tabular = plan_tabular(value, options)
+        if tabular:
+            rows, header, columns = tabular
+            encode_array_of_objects_as_tabular(key, rows, header, writer, depth, options, columns)
+            return None
 
-    encode_mixed_array_as_list_items(key, value, writer, depth, options)
+    header = format_header(len(value), key=key, delimiter=options.delimiter, length_marker=options.length_marker)
+    writer.push(depth, header)
+    return (_ITEMS, iter(value), depth + 1)
 
 
 def encode_inline_primitive_array(
@@ -114,6 +339,49 @@ def encode_array_of_arrays_as_list_items(
             writer.push(depth + 1, f"{LIST_ITEM_PREFIX}{inline}")
 
 
+def matrix_width(rows: Sequence[JsonArray]) -> int | None:
+    """Return the common length of ``rows``, or ``None`` if they differ or are empty."""
+    width = len(rows[0]) if rows else 0
+    if width and all(len(row) == width for row in rows):
+        return width
+    return None
+
+
+def encode_array_of_arrays_as_matrix(
+    prefix: str | None,
+    rows: Sequence[JsonArray],
+    width: int,
+    writer: LineWriter,
+    depth: Depth,
+    options: ResolvedEncodeOptions,
+) -> None:
+    header = format_header(
+        len(rows),
+        key=prefix,
+        width=width,
+        delimiter=options.delimiter,
+        length_marker=options.length_marker,
+    )
+    writer.push(depth, header)
+    write_matrix_rows(rows, width, writer, depth + 1, options)
+
+
+def write_matrix_rows(
+    rows: Sequence[JsonArray],
+    width: int,
+    writer: LineWriter,
+    depth: Depth,
+    options: ResolvedEncodeOptions,
+) -> None:
+    # Cells are encoded as one flat column, so a matrix of numbers or safe
+    # strings is classified and formatted in a single batch.
+    delimiter = options.delimiter
+    cells = encode_column([cell for row in rows for cell in row], delimiter)
+    join = delimiter.join
+    for start in range(0, len(cells), width):
+        writer.push(depth, join(cells[start:start + width]))
+
+
 def format_inline_array(
     values: Sequence[JsonPrimitive],
     delimiter: str,
@@ -134,6 +402,7 @@ def encode_array_of_objects_as_tabular(
     writer: LineWriter,
     depth: Depth,
     options: ResolvedEncodeOptions,
+    columns: Columns | None = None,
 ) -> None:
     header_str = format_header(
         len(rows),
@@ -143,43 +412,166 @@ def encode_array_of_objects_as_tabular(
         length_marker=options.length_marker,
     )
     writer.push(depth, header_str)
-    write_tabular_rows(rows, header, writer, depth + 1, options)
+    write_tabular_rows(rows, header, writer, depth + 1, options, columns)
 
 
-def detect_tabular_header(rows: Sequence[JsonObject]) -> List[str] | None:
+# Cells of tabular rows grouped by column, in header order.
+Columns = List[Sequence[JsonPrimitive]]
+
+TabularPlan = Tuple[Sequence[JsonObject], List[str], Optional[Columns]]
+
+# Largest share of cells that sparse tabular form may fill with ``null``;
+# sparser arrays are shorter in list form.
+SPARSE_TABULAR_MAX_MISSING = 0.5
+
+
+def plan_tabular(rows: Sequence[JsonObject], options: ResolvedEncodeOptions) -> TabularPlan | None:
+    """Return the rows, header and cells to write in tabular form, or ``None``.
+
+    Cells are returned by column when detection already gathered them, and
+    as ``None`` otherwise. Arrays with a declared schema are trusted and
+    skip detection entirely. When ``options.flatten_depth`` is set and the
+    rows are not tabular as-is, nested objects are flattened into dotted
+    columns and detection is retried.
+    """
+    if isinstance(rows, TabularArray):
+        if options.verify_schemas:
+            verify_schema(rows, rows.schema)
+        return rows, list(rows.schema.fields), None
+    plan = _plan_rows(rows, options.sparse_tabular)
+    if plan is None and options.flatten_depth:
+        flattened = flatten_rows(rows, options.flatten_depth)
+        if flattened is not None:
+            plan = _plan_rows(flattened, options.sparse_tabular)
+    return plan
+
+
+def _plan_rows(rows: Sequence[JsonObject], sparse: bool) -> TabularPlan | None:
     if not rows:
         return None
-    first_row = rows[0]
-    if not first_row:
+    if sparse:
+        header = detect_sparse_tabular_header(rows)
+        if not header:
+            return None
+        cells = len(rows) * len(header)
+        if cells - sum(map(len, rows)) > SPARSE_TABULAR_MAX_MISSING * cells:
+            return None
+        return rows, header, None
+    if not rows[0]:
         return None
-    header = list(first_row.keys())
-    if is_tabular_array(rows, header):
-        return header
-    return None
+    header = list(rows[0])
+    columns = collect_tabular_columns(rows, header)
+    return (rows, header, columns) if columns is not None else None
+
+
+def collect_tabular_columns(rows: Sequence[JsonObject], header: Sequence[str]) -> Columns | None:
+    """Gather the cells of ``rows`` by column, or return ``None`` if they are not tabular.
+
+    This assumes the header holds and checks it while reading: every row
+    must have exactly the header's keys, and every cell must be primitive.
+    Each row is read once; the cells gathered are then written without
+    looking at the rows again.
+    """
+    width = len(header)
+    if any(len(row) != width for row in rows):
+        return None
+    if not all(map(is_json_primitive, rows[0].values())):
+        return None
+    getter = itemgetter(*header)
+    try:
+        cells = list(map(getter, rows))
+    except KeyError:
+        return None
+    columns: Columns = list(zip(*cells)) if width > 1 else [cells]
+    for column in columns:
+        if not PRIMITIVE_TYPES.issuperset(map(type, column)) and not all(map(is_json_primitive, column)):
+            return None
+    return columns
+
+
+def detect_tabular_header(rows: Sequence[JsonObject]) -> List[str] | None:
+    """Return the first row's keys if ``rows`` can be written in tabular form."""
+    plan = _plan_rows(rows, sparse=False)
+    return plan[1] if plan else None
 
 
 def is_tabular_array(rows: Sequence[JsonObject], header: Sequence[str]) -> bool:
-    header_set = set(header)
+    """Whether every row has exactly the keys in ``header``, all with primitive values."""
+    if not rows or not header:
+        return not any(rows)
+    return collect_tabular_columns(rows, header) is not None
+
+
+def flatten_rows(rows: Sequence[JsonObject], max_depth: int) -> List[JsonObject] | None:
+    """Flatten nested objects in each row into ``parent.child`` keys.
+
+    Returns ``None`` if any row cannot be flattened unambiguously: a nested
+    object is empty or deeper than ``max_depth``, a value is an array, or a
+    key already contains a dot.
+    """
+    flattened: List[JsonObject] = []
     for row in rows:
-        if set(row.keys()) != header_set:
+        flat: JsonObject = {}
+        if not _flatten_into(flat, row, "", max_depth):
+            return None
+        flattened.append(flat)
+    return flattened
+
+
+def _flatten_into(target: JsonObject, value: JsonObject, prefix: str, remaining: int) -> bool:
+    for key, item in value.items():
+        if "." in key:
             return False
-        for key in header:
-            if not is_json_primitive(row.get(key)):
+        if is_json_primitive(item):
+            target[prefix + key] = item
+        elif is_json_object(item) and item and remaining > 0:
+            if not _flatten_into(target, item, f"{prefix}{key}.", remaining - 1):
                 return False
+        else:
+            return False
     return True
 
 
+def detect_sparse_tabular_header(rows: Sequence[JsonObject]) -> List[str] | None:
+    """Return the union of all row keys, or ``None`` if a value is not primitive.
+
+    Keys keep the first row's order, followed by new keys in encounter order.
+    Rows missing a key are written with ``null`` in that column.
+    """
+    seen: Dict[str, None] = {}
+    for row in rows:
+        for key, item in row.items():
+            if not is_json_primitive(item):
+                return None
+            if key not in seen:
+                seen[key] = None
+    return list(seen)
+
+
 def write_tabular_rows(
     rows: Sequence[JsonObject],
     header: Sequence[str],
     writer: LineWriter,
     depth: Depth,
     options: ResolvedEncodeOptions,
+    columns: Columns | None = None,
 ) -> None:
-    for row in rows:
-        values = [row[key] for key in header]
-        joined_value = join_encoded_values(values, options.delimiter)
-        writer.push(depth, joined_value)
+    """Write one line per row; ``columns`` holds the cells if already gathered.
+
+    Raises :class:`SchemaError` if a cell is not a primitive, which only the
+    unchecked rows of a trusted array can hold.
+    """
+    delimiter = options.delimiter
+    if columns is None:
+        columns = [[row.get(key) for row in rows] for key in header]
+    encoded = []
+    for key, column in zip(header, columns):
+        try:
+            encoded.append(encode_column(column, delimiter))
+        except TypeError as exc:
+            raise SchemaError(f"field {key!r}: {exc}; enable verify_schemas to find the row") from None
+    for cells in zip(*encoded):
+        writer.push(depth, delimiter.join(cells))
 
 
 def encode_mixed_array_as_list_items(
@@ -191,29 +583,55 @@ def encode_mixed_array_as_list_items(
 ) -> None:
     header = format_header(len(items), key=prefix, delimiter=options.delimiter, length_marker=options.length_marker)
     writer.push(depth, header)
+    write_frames([(_ITEMS, iter(items), depth + 1)], writer, options)
 
-    for item in items:
-        if is_json_primitive(item):
-            writer.push(depth + 1, f"{LIST_ITEM_PREFIX}{encode_primitive(item, options.delimiter)}")
-        elif is_json_array(item):
-            if is_array_of_primitives(item):
-                inline = format_inline_array(item, options.delimiter, None, options.length_marker)
-                writer.push(depth + 1, f"{LIST_ITEM_PREFIX}{inline}")
-            else:
-                writer.push(depth + 1, LIST_ITEM_MARKER)
-                encode_array(None, item, writer, depth + 2, options)
-        elif is_json_object(item):
-            encode_object_as_list_item(item, writer, depth + 1, options)
+
+def encode_list_item(item: JsonValue, writer: LineWriter, depth: Depth, options: ResolvedEncodeOptions) -> None:
+    write_frames([(_ITEMS, iter((item,)), depth)], writer, options)
 
 
 def encode_object_as_list_item(obj: JsonObject, writer: LineWriter, depth: Depth, options: ResolvedEncodeOptions) -> None:
-    items = list(obj.items())
-    if not items:
+    write_frames([(_ITEMS, iter((obj,)), depth)], writer, options)
+
+
+def write_list_item(
+    item: JsonValue,
+    writer: LineWriter,
+    depth: Depth,
+    options: ResolvedEncodeOptions,
+    first_field: bool = False,
+) -> List[Frame]:
+    """Write the lines of ``item`` that need no nesting and return frames for the rest.
+
+    Frames are returned in stack order: the last one is written first.
+    """
+    if is_json_primitive(item):
+        writer.push(depth, f"{LIST_ITEM_PREFIX}{encode_primitive(item, options.delimiter)}")
+    elif is_json_array(item):
+        if is_array_of_primitives(item):
+            inline = format_inline_array(item, options.delimiter, None, options.length_marker)
+            writer.push(depth, f"{LIST_ITEM_PREFIX}{inline}")
+        elif not first_field:
+            writer.push(depth, LIST_ITEM_MARKER)
+            child = write_array(None, item, writer, depth + 1, options)
+            if child is not None:
+                return [child]
+    elif is_json_object(item):
+        return write_object_list_item(item, writer, depth, options)
+    return []
+
+
+def write_object_list_item(obj: JsonObject, writer: LineWriter, depth: Depth, options: ResolvedEncodeOptions) -> List[Frame]:
+    """Write the first line of a list item object; see :func:`write_list_item`."""
+    entries = iter(obj.items())
+    first = next(entries, None)
+    if first is None:
         writer.push(depth, LIST_ITEM_MARKER)
-        return
+        return []
 
-    first_key, first_value = items[0]
+    first_key, first_value = first
     encoded_first_key = encode_key(first_key)
+    frames: List[Frame] = [(_FIELDS, entries, depth + 1)] if len(obj) > 1 else []
 
     if is_json_primitive(first_value):
         writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}: {encode_primitive(first_value, options.delimiter)}")
@@ -222,38 +640,37 @@ def encode_object_as_list_item(obj: JsonObject, writer: LineWriter, depth: Depth
             formatted = format_inline_array(first_value, options.delimiter, first_key, options.length_marker)
             writer.push(depth, f"{LIST_ITEM_PREFIX}{formatted}")
         elif is_array_of_objects(first_value):
-            header = detect_tabular_header(first_value)
-            if header:
+            tabular = plan_tabular(first_value, options)
+            if tabular:
+                rows, header, columns = tabular
                 header_str = format_header(
-                    len(first_value),
+                    len(rows),
                     key=first_key,
                     fields=header,
                     delimiter=options.delimiter,
                     length_marker=options.length_marker,
                 )
                 writer.push(depth, f"{LIST_ITEM_PREFIX}{header_str}")
-                write_tabular_rows(first_value, header, writer, depth + 1, options)
+                write_tabular_rows(rows, header, writer, depth + 1, options, columns)
             else:
                 writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}[{len(first_value)}]:")
-                for item in first_value:
-                    encode_object_as_list_item(item, writer, depth + 1, options)
+                frames.append((_ITEMS, iter(first_value), depth + 1))
+        elif options.matrix_arrays and _is_matrix(first_value):
+            width = len(first_value[0])
+            header_str = format_header(
+                len(first_value),
+                key=first_key,
+                width=width,
+                delimiter=options.delimiter,
+                length_marker=options.length_marker,
+            )
+            writer.push(depth, f"{LIST_ITEM_PREFIX}{header_str}")
+            write_matrix_rows(first_value, width, writer, depth + 1, options)
         else:
             writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}[{len(first_value)}]:")
-            for item in first_value:
-                if is_json_primitive(item):
-                    writer.push(depth + 1, f"{LIST_ITEM_PREFIX}{encode_primitive(item, options.delimiter)}")
-                elif is_json_array(item) and is_array_of_primitives(item):
-                    inline = format_inline_array(item, options.delimiter, None, options.length_marker)
-                    writer.push(depth + 1, f"{LIST_ITEM_PREFIX}{inline}")
-                elif is_json_object(item):
-                    encode_object_as_list_item(item, writer, depth + 1, options)
+            frames.append((_FIRST_FIELD_ITEMS, iter(first_value), depth + 1))
     elif is_json_object(first_value):
-        if not first_value:
-            writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}:")
-        else:
-            writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}:")
-            encode_object(first_value, writer, depth + 2, options)
-
-    for key, value in items[1:]:
-        encode_key_value_pair(key, value, writer, depth + 1, options)
-
+        writer.push(depth, f"{LIST_ITEM_PREFIX}{encoded_first_key}:")
+        if first_value:
+            frames.append((_FIELDS, iter(first_value.items()), depth + 2))
+    return frames
@@ -2,60 +2,321 @@
 
 from __future__ import annotations
 
+import base64
 import math
 from collections.abc import Mapping, Sequence
-from datetime import date, datetime
-from typing import Any, Iterable
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from uuid import UUID
 
-from .types import JsonArray, JsonObject, JsonPrimitive, JsonValue
+from .schema import TabularArray
+from .types import DefaultHook, JsonArray, JsonObject, JsonPrimitive, JsonValue
 
 
-def normalize_value(value: Any) -> JsonValue:
-    """Convert arbitrary Python values into JSON-compatible structures."""
-    if value is None:
+Handler = Callable[[Any, Optional[DefaultHook]], Any]
+
+
+def normalize_value(
+    value: Any,
+    default: Optional[DefaultHook] = None,
+    shared: Optional[Set[int]] = None,
+) -> JsonValue:
+    """Convert arbitrary Python values into JSON-compatible structures.
+
+    Values are dispatched on their exact type; other types are resolved once
+    through their MRO and cached. ``default`` is called for objects no
+    handler supports, and its result is normalized in turn. Containers are
+    filled from an explicit stack, so nesting depth is not limited by the
+    interpreter's recursion limit.
+
+    An object referenced more than once is normalized once and the result is
+    reused; if ``shared`` is given, the ids of such results are added to it.
+    Raises ``ValueError`` if ``value`` contains a reference cycle.
+    """
+    stack: List[Expansion] = []
+    state = _State(stack, default, shared)
+    root = state.begin(value, _dispatch(value, default))
+
+    dispatch = _DISPATCH
+    identity = _normalize_identity
+    remember = state.results.setdefault
+    keep = state.originals.append
+    fill = state.filling.add
+    done = state.filling.discard
+    while stack:
+        container, entries, keyed = stack[-1]
+        if keyed:
+            for key, item in entries:
+                handler = dispatch.get(type(item)) or _resolve_handler(type(item))
+                normalized = item if handler is identity else handler(item, default)
+                if type(normalized) is tuple:
+                    # The common case of a container seen for the first time.
+                    if len(normalized) == 3 and remember(id(item), normalized[0]) is normalized[0]:
+                        container[str(key)] = normalized[0]
+                        keep(item)
+                        fill(id(normalized[0]))
+                        stack.append(normalized)
+                        break
+                    container[str(key)] = state.begin(item, normalized)
+                    if stack[-1][0] is not container:
+                        break
+                else:
+                    container[str(key)] = normalized
+            else:
+                stack.pop()
+                done(id(container))
+        else:
+            append = container.append
+            for item in entries:
+                handler = dispatch.get(type(item)) or _resolve_handler(type(item))
+                normalized = item if handler is identity else handler(item, default)
+                if type(normalized) is tuple:
+                    if len(normalized) == 3 and remember(id(item), normalized[0]) is normalized[0]:
+                        append(normalized[0])
+                        keep(item)
+                        fill(id(normalized[0]))
+                        stack.append(normalized)
+                        break
+                    append(state.begin(item, normalized))
+                    if stack[-1][0] is not container:
+                        break
+                else:
+                    append(normalized)
+            else:
+                stack.pop()
+                done(id(container))
+    return root
+
+
+# Handlers return either a finished value or a tuple. A 1-tuple holds a
+# value to normalize in place of the original, as for enums and registered
+# types. A 3-tuple is an ``Expansion``: an empty container, an iterator over
+# the entries still to normalize into it, and whether those entries are
+# ``(key, value)`` pairs. Normalized values are never tuples.
+Conversion = Tuple[Any]
+Expansion = Tuple[Union[JsonObject, JsonArray], Iterator[Any], bool]
+
+
+class _State:
+    """Tracks the objects seen during one call to :func:`normalize_value`."""
+
+    __slots__ = ("stack", "default", "shared", "results", "originals", "filling")
+
+    def __init__(self, stack: List[Expansion], default: Optional[DefaultHook], shared: Optional[Set[int]]) -> None:
+        self.stack = stack
+        self.default = default
+        self.shared = shared if shared is not None else set()
+        # Normalized containers by the id of the object they came from.
+        self.results: Dict[int, Union[JsonObject, JsonArray]] = {}
+        # Ids of the containers on ``stack``, which are still being filled in;
+        # reaching one of them again means the input contains a cycle.
+        self.filling: Set[int] = set()
+        # Keeps every object in ``results`` alive so its id is not reused.
+        self.originals: List[Any] = []
+
+    def begin(self, value: Any, result: Union[JsonValue, Conversion, Expansion]) -> JsonValue:
+        """Return the normalized value for a handler's ``result``.
+
+        New containers are returned empty and pushed on the stack to be
+        filled in.
+        """
+        converted: List[Any] = []
+        while True:
+            container = self.results.get(id(value))
+            if container is not None:
+                if id(container) in self.filling:
+                    raise _circular(value)
+                self.shared.add(id(container))
+                self._remember(converted, container)
+                return container
+            if type(result) is not tuple:
+                return result
+            for item in converted:
+                if item is value:
+                    raise _circular(value)
+            converted.append(value)
+            if len(result) == 1:
+                value = result[0]
+                result = _dispatch(value, self.default)
+                continue
+            self._remember(converted, result[0])
+            self.filling.add(id(result[0]))
+            self.stack.append(result)
+            return result[0]
+
+    def _remember(self, values: List[Any], container: Union[JsonObject, JsonArray]) -> None:
+        for value in values:
+            self.results[id(value)] = container
+            self.originals.append(value)
+
+
+def _circular(value: Any) -> ValueError:
+    return ValueError(f"Circular reference detected: {type(value).__name__} object contains itself")
+
+
+def _dispatch(value: Any, default: Optional[DefaultHook]) -> Union[JsonValue, Conversion, Expansion]:
+    cls = type(value)
+    handler = _DISPATCH.get(cls)
+    if handler is None:
+        handler = _resolve_handler(cls)
+    return handler(value, default)
+
+
+def register_type(cls: type, handler: Callable[[Any], Any]) -> None:
+    """Register ``handler`` to convert instances of ``cls`` (and subclasses).
+
+    The handler receives the value and returns any value ``normalize_value``
+    supports; the result is normalized again.
+    """
+
+    def normalize_registered(value: Any, default: Optional[DefaultHook]) -> Conversion:
+        return (handler(value),)
+
+    _REGISTERED[cls] = normalize_registered
+    _reset_dispatch()
+
+
+def _resolve_handler(cls: type) -> Handler:
+    is_enum = issubclass(cls, Enum)
+    handler: Optional[Handler] = None
+    for base in cls.__mro__:
+        handler = _REGISTERED.get(base)
+        # Members of enums with a built-in mixin such as ``int`` or ``str``
+        # are normalized by value, not by the mixin's built-in handler.
+        if handler is not None and not (is_enum and handler is _BUILTIN_HANDLERS.get(base)):
+            break
+        handler = None
+    if handler is None:
+        if is_enum:
+            handler = _normalize_enum
+        elif issubclass(cls, Mapping):
+            handler = _normalize_mapping
+        elif issubclass(cls, Sequence):
+            handler = _normalize_sequence
+        else:
+            handler = _normalize_fallback
+    _DISPATCH[cls] = handler
+    return handler
+
+
+def _normalize_none(value: None, default: Optional[DefaultHook]) -> JsonValue:
+    return None
+
+
+def _normalize_identity(value: Any, default: Optional[DefaultHook]) -> JsonValue:
+    return value
+
+
+def _normalize_int(value: int, default: Optional[DefaultHook]) -> JsonValue:
+    return int(value)
+
+
+def _normalize_float(value: float, default: Optional[DefaultHook]) -> JsonValue:
+    if value == 0.0:
+        return 0
+    if not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def _normalize_decimal(value: Decimal, default: Optional[DefaultHook]) -> JsonValue:
+    if not value.is_finite():
         return None
+    if value == value.to_integral_value():
+        return int(value)
+    return float(value)
+
+
+def _normalize_isoformat(value: Union[date, time], default: Optional[DefaultHook]) -> JsonValue:
+    return value.isoformat()
+
+
+def _normalize_timedelta(value: timedelta, default: Optional[DefaultHook]) -> JsonValue:
+    return _normalize_float(value.total_seconds(), default)
+
+
+def _normalize_str(value: Any, default: Optional[DefaultHook]) -> JsonValue:
+    return str(value)
+
+
+def _normalize_bytes(value: Union[bytes, bytearray, memoryview], default: Optional[DefaultHook]) -> JsonValue:
+    return base64.b64encode(value).decode("ascii")
+
+
+def _normalize_enum(value: Enum, default: Optional[DefaultHook]) -> Conversion:
+    return (value.value,)
+
 
-    if isinstance(value, (str, bool)):
-        return value
-
-    if isinstance(value, (int, float)):
-        if isinstance(value, bool):
-            # bool is a subclass of int, but we already covered actual bool at top
-            return bool(value)
-        if isinstance(value, float):
-            if value == 0.0:
-                return 0
-            if not math.isfinite(value):
-                return None
-        return value
-
-    if isinstance(value, datetime):
-        return value.isoformat()
-    if isinstance(value, date):
-        return value.isoformat()
-
-    if isinstance(value, set):
-        return [normalize_value(item) for item in value]
-
-    if isinstance(value, Mapping):
-        return {
-            str(key): normalize_value(val)
-            for key, val in value.items()
-        }
-
-    if isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray)):
-        return [normalize_value(item) for item in value]
+def _normalize_mapping(value: Mapping[Any, Any], default: Optional[DefaultHook]) -> Expansion:
+    return {}, iter(value.items()), True
+
+
+def _normalize_sequence(value: Iterable[Any], default: Optional[DefaultHook]) -> Expansion:
+    return [], iter(value), False
+
+
+def _normalize_tabular(value: TabularArray, default: Optional[DefaultHook]) -> Expansion:
+    return TabularArray((), value.schema), iter(value), False
+
+
+def _normalize_fallback(value: Any, default: Optional[DefaultHook]) -> Union[JsonValue, Conversion, Expansion]:
+    if default is not None:
+        return (default(value),)
 
     # Fallback for objects with __dict__
     if hasattr(value, "__dict__"):
-        return {
-            str(key): normalize_value(val)
-            for key, val in vars(value).items()
-        }
+        return {}, iter(vars(value).items()), True
 
     return None
 
 
+_REGISTERED: Dict[type, Handler] = {
+    type(None): _normalize_none,
+    str: _normalize_identity,
+    bool: _normalize_identity,
+    int: _normalize_int,
+    float: _normalize_float,
+    Decimal: _normalize_decimal,
+    datetime: _normalize_isoformat,
+    date: _normalize_isoformat,
+    time: _normalize_isoformat,
+    timedelta: _normalize_timedelta,
+    UUID: _normalize_str,
+    PurePath: _normalize_str,
+    bytes: _normalize_bytes,
+    bytearray: _normalize_bytes,
+    memoryview: _normalize_bytes,
+    dict: _normalize_mapping,
+    list: _normalize_sequence,
+    tuple: _normalize_sequence,
+    set: _normalize_sequence,
+    frozenset: _normalize_sequence,
+    TabularArray: _normalize_tabular,
+}
+
+_BUILTIN_HANDLERS: Dict[type, Handler] = dict(_REGISTERED)
+
+_DISPATCH: Dict[type, Handler] = {}
+
+
+def _reset_dispatch() -> None:
+    _DISPATCH.clear()
+    _DISPATCH.update(_REGISTERED)
+    # A plain ``int`` is already normalized; ``_normalize_int`` is only
+    # needed to convert subclasses.
+    if _REGISTERED[int] is _normalize_int:
+        _DISPATCH[int] = _normalize_identity
+
+
+_reset_dispatch()
+
+
+PRIMITIVE_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
 def is_json_primitive(value: Any) -> bool:
     return value is None or isinstance(value, (str, int, float, bool))
 
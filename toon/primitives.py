@@ -4,7 +4,8 @@ from __future__ import annotations
 
 import math
 import re
-from typing import Iterable, List, Sequence
+from functools import lru_cache
+from typing import Dict, Iterable, List, Pattern, Sequence, Tuple
 
 from .constants import (
     BACKSLASH,
@@ -12,7 +13,6 @@ from .constants import (
     DEFAULT_DELIMITER,
     DOUBLE_QUOTE,
     FALSE_LITERAL,
-    LIST_ITEM_MARKER,
     NULL_LITERAL,
     TRUE_LITERAL,
 )
@@ -46,48 +46,123 @@ def encode_string_literal(value: str, delimiter: str = COMMA) -> str:
     return f'{DOUBLE_QUOTE}{escape_string(value)}{DOUBLE_QUOTE}'
 
 
+ESCAPE_TABLE = {
+    ord(BACKSLASH): BACKSLASH * 2,
+    ord(DOUBLE_QUOTE): BACKSLASH + DOUBLE_QUOTE,
+    ord("\n"): "\\n",
+    ord("\r"): "\\r",
+    ord("\t"): "\\t",
+}
+
+
 def escape_string(value: str) -> str:
-    return (
-        value.replace(BACKSLASH, BACKSLASH * 2)
-        .replace(DOUBLE_QUOTE, BACKSLASH + DOUBLE_QUOTE)
-        .replace("\n", "\\n")
-        .replace("\r", "\\r")
-        .replace("\t", "\\t")
-    )
+    return value.translate(ESCAPE_TABLE)
 
 
 def is_safe_unquoted(value: str, delimiter: str = COMMA) -> bool:
-    if value == "":
-        return False
-    if value.strip() != value:
-        return False
-    if value in (TRUE_LITERAL, FALSE_LITERAL, NULL_LITERAL):
-        return False
-    if _is_numeric_like(value):
-        return False
-    if ":" in value:
-        return False
-    if '"' in value or "\\" in value:
-        return False
-    if re.search(r"[\[\]\{\}]", value):
-        return False
-    if re.search(r"[\n\r\t]", value):
-        return False
-    if delimiter and delimiter in value:
-        return False
-    if value.startswith(LIST_ITEM_MARKER):
-        return False
-    return True
-
-
-NUMERIC_LIKE_PATTERN = re.compile(r"^-?\d+(?:\.\d+)?(?:e[+-]?\d+)?$", re.IGNORECASE)
-LEADING_ZERO_PATTERN = re.compile(r"^0\d+$")
-
-
-def _is_numeric_like(value: str) -> bool:
-    return bool(NUMERIC_LIKE_PATTERN.match(value) or LEADING_ZERO_PATTERN.match(value))
+    # One scan for forbidden characters, then checks that only look at the
+    # start and end of the string.
+    return (
+        unsafe_character_pattern(delimiter).search(value) is None
+        and UNSAFE_PREFIX_PATTERN.match(value) is None
+        and not value[-1:].isspace()
+    )
 
 
+# Matches at the start of strings that must be quoted: empty, leading
+# whitespace or hyphen (which also covers negative numbers), literals and
+# numeric-like values.
+_UNSAFE_PREFIX = r"(?:{end}|\s|-|(?:true|false|null){end}|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?{end})"
+UNSAFE_PREFIX_PATTERN = re.compile(_UNSAFE_PREFIX.format(end=r"\Z"))
+
+# Structural characters, control characters and the active delimiter.
+_UNSAFE_CHARACTERS = '[:"\\\\\\[\\]{{}}\r\t{newline}{delimiter}]'
+
+UNSAFE_CHARACTER_PATTERNS: Dict[str, Pattern[str]] = {}
+UNSAFE_COLUMN_PATTERNS: Dict[str, Pattern[str]] = {}
+
+
+def unsafe_character_pattern(delimiter: str | None = COMMA) -> Pattern[str]:
+    """Return a pattern matching any character that forces quoting."""
+    delimiter = delimiter or ""
+    pattern = UNSAFE_CHARACTER_PATTERNS.get(delimiter)
+    if pattern is None:
+        pattern = re.compile(_UNSAFE_CHARACTERS.format(newline="\n", delimiter=re.escape(delimiter)))
+        UNSAFE_CHARACTER_PATTERNS[delimiter] = pattern
+    return pattern
+
+
+def unsafe_column_pattern(delimiter: str | None = COMMA) -> Pattern[str]:
+    """Return a multiline pattern for strings joined with newlines.
+
+    Searching ``"\\n".join(cells)`` finds a match if any cell must be quoted,
+    provided no cell itself contains a newline.
+    """
+    delimiter = delimiter or ""
+    pattern = UNSAFE_COLUMN_PATTERNS.get(delimiter)
+    if pattern is None:
+        pattern = re.compile(
+            "^" + _UNSAFE_PREFIX.format(end="$")
+            + r"|\s$|"
+            + _UNSAFE_CHARACTERS.format(newline="", delimiter=re.escape(delimiter)),
+            re.MULTILINE,
+        )
+        UNSAFE_COLUMN_PATTERNS[delimiter] = pattern
+    return pattern
+
+
+def encode_string_column(values: Sequence[str], delimiter: str = COMMA) -> Sequence[str]:
+    """Encode a column of strings, proving the whole column safe in one scan."""
+    joined = "\n".join(values)
+    if joined.count("\n") == len(values) - 1 and unsafe_column_pattern(delimiter).search(joined) is None:
+        return values
+    return [encode_string_literal(value, delimiter) for value in values]
+
+
+def encode_column(values: Sequence[JsonPrimitive], delimiter: str = COMMA) -> Sequence[str]:
+    """Encode one tabular column, classifying its cell types once.
+
+    Raises ``TypeError`` if a cell is not a primitive.
+    """
+    cell_types = set(map(type, values))
+    if cell_types == _STR_TYPE:
+        return encode_string_column(values, delimiter)
+    if cell_types == _INT_TYPE:
+        return list(map(str, values))
+    if cell_types <= _NUMBER_TYPES:
+        return encode_number_column(values)
+    others = cell_types - _CELL_TYPES
+    if others:
+        raise TypeError(f"expected a primitive, got {next(iter(others)).__name__}")
+    return [encode_primitive(value, delimiter) for value in values]
+
+
+_STR_TYPE = frozenset((str,))
+_INT_TYPE = frozenset((int,))
+_NUMBER_TYPES = frozenset((int, float))
+_CELL_TYPES = frozenset((str, int, float, bool, type(None)))
+
+# Floats whose magnitude is in this range take the fixed-point branch of
+# ``_format_float_js_like``. The bounds are narrower than its exponent test so
+# that rounding in ``log10`` cannot put a value on the other side.
+FIXED_POINT_MIN = 1e-5
+FIXED_POINT_MAX = 1e20
+
+
+def encode_number_column(values: Sequence[int | float]) -> List[str]:
+    """Encode a column of ints and floats, formatting most floats inline."""
+    return [
+        str(value) if type(value) is int
+        else f"{value:.15f}".rstrip("0").rstrip(".") if FIXED_POINT_MIN <= abs(value) < FIXED_POINT_MAX
+        else encode_primitive(value)
+        for value in values
+    ]
+
+
+KEY_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def encode_key(key: str) -> str:
     if _is_valid_unquoted_key(key):
         return key
@@ -110,6 +185,7 @@ def format_header(
     *,
     key: str | None = None,
     fields: Sequence[str] | None = None,
+    width: int | None = None,
     delimiter: str = COMMA,
     length_marker: LengthMarker = False,
 ) -> str:
@@ -121,13 +197,22 @@ def format_header(
     delimiter_suffix = delimiter if delimiter != DEFAULT_DELIMITER else ""
     header += f"[{marker}{length}{delimiter_suffix}]"
 
+    if width is not None:
+        header += f"[{marker}{width}]"
+
     if fields:
-        header += "{" + delimiter.join(encode_key(field) for field in fields) + "}"
+        header += format_fields(tuple(fields), delimiter)
 
     header += ":"
     return header
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def format_fields(fields: Tuple[str, ...], delimiter: str = COMMA) -> str:
+    """Return the ``{f1<delim>f2}`` field list fragment of a tabular header."""
+    return "{" + delimiter.join(encode_key(field) for field in fields) + "}"
+
+
 def _format_float_js_like(value: float) -> str:
     abs_value = abs(value)
     if abs_value == 0.0:
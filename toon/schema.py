@@ -0,0 +1,155 @@
+"""Declared schemas for arrays of objects with a known, fixed shape."""
+
+from __future__ import annotations
+
+from typing import AbstractSet, Any, Iterable, List, Mapping, Optional, Sequence, Tuple, Type, Union
+
+ColumnType = Union[Type[Any], Tuple[Type[Any], ...]]
+
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+class SchemaError(ValueError):
+    """Raised when a row does not match the schema declared for its array."""
+
+
+class Schema:
+    """Field order and optional column types for a tabular array.
+
+    Arrays with a schema are trusted: the encoder writes the header straight
+    from ``fields`` and formats rows without checking them, unless schema
+    verification is enabled in the options.
+    """
+
+    __slots__ = ("fields", "types")
+
+    def __init__(self, fields: Iterable[str], types: Optional[Mapping[str, ColumnType]] = None) -> None:
+        self.fields: Tuple[str, ...] = tuple(fields)
+        if not self.fields:
+            raise ValueError("a schema must declare at least one field")
+        if len(set(self.fields)) != len(self.fields):
+            raise ValueError("schema fields must be unique")
+        types = dict(types or {})
+        unknown = [name for name in types if name not in self.fields]
+        if unknown:
+            raise ValueError(f"types given for undeclared fields: {', '.join(map(repr, unknown))}")
+        self.types: Tuple[Optional[ColumnType], ...] = tuple(_column_type(types.get(name)) for name in self.fields)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Schema):
+            return NotImplemented
+        return self.fields == other.fields and self.types == other.types
+
+    def __hash__(self) -> int:
+        return hash((self.fields, self.types))
+
+    def __repr__(self) -> str:
+        types = {name: kind for name, kind in zip(self.fields, self.types) if kind is not None}
+        if types:
+            return f"Schema({list(self.fields)!r}, {types!r})"
+        return f"Schema({list(self.fields)!r})"
+
+
+SchemaLike = Union[Schema, Sequence[str]]
+
+
+def as_schema(schema: SchemaLike) -> Schema:
+    if isinstance(schema, Schema):
+        return schema
+    if isinstance(schema, str):
+        raise TypeError("schema fields must be a sequence of names, not a string")
+    return Schema(schema)
+
+
+class TabularArray(list):
+    """A list of row objects tagged with a trusted :class:`Schema`."""
+
+    __slots__ = ("schema",)
+
+    def __init__(self, rows: Iterable[Any], schema: SchemaLike) -> None:
+        super().__init__(rows)
+        self.schema = as_schema(schema)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r}, {self.schema!r})"
+
+    def __reduce__(self) -> Any:
+        return (type(self), (list(self), self.schema))
+
+
+def verify_schema(rows: Sequence[Any], schema: Schema) -> None:
+    """Raise :class:`SchemaError` describing the first row violating ``schema``."""
+    fields = schema.fields
+    field_set = set(fields)
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise SchemaError(f"row {index}: expected an object, got {type(row).__name__}")
+        if len(row) != len(fields) or not field_set.issuperset(row):
+            for name in fields:
+                if name not in row:
+                    raise SchemaError(f"row {index}: missing field {name!r}")
+            extra = next(name for name in row if name not in field_set)
+            raise SchemaError(f"row {index}: unexpected field {extra!r}")
+        for name, kind in zip(fields, schema.types):
+            value = row[name]
+            if not isinstance(value, _PRIMITIVE_TYPES):
+                raise SchemaError(f"row {index}, field {name!r}: expected a primitive, got {type(value).__name__}")
+            if kind is not None and not _matches(value, kind):
+                raise SchemaError(
+                    f"row {index}, field {name!r}: expected {_type_name(kind)}, got {type(value).__name__}"
+                )
+
+
+def apply_schemas(
+    value: Any,
+    schemas: Sequence[Tuple[Tuple[str, ...], Schema]],
+    shared: AbstractSet[int] = frozenset(),
+) -> Any:
+    """Tag the arrays found at each dotted key path with their schema.
+
+    Paths that are absent or do not lead to an array are ignored. ``value``
+    must be a normalized value; the containing objects are updated in place,
+    except those whose ids are in ``shared`` (objects that also occur
+    elsewhere in ``value``), which are copied first.
+    """
+    for path, schema in schemas:
+        if not path:
+            if type(value) is list:
+                value = TabularArray(value, schema)
+            continue
+        parents = [value]
+        for key in path[:-1]:
+            parent = parents[-1]
+            parents.append(parent.get(key) if isinstance(parent, dict) else None)
+        parent = parents[-1]
+        if not isinstance(parent, dict) or type(parent.get(path[-1])) is not list:
+            continue
+        copy_from = next((index for index, item in enumerate(parents) if id(item) in shared), None)
+        if copy_from is not None:
+            for index in range(copy_from, len(parents)):
+                parents[index] = dict(parents[index])
+                if index:
+                    parents[index - 1][path[index - 1]] = parents[index]
+            value = parents[0]
+        parent = parents[-1]
+        parent[path[-1]] = TabularArray(parent[path[-1]], schema)
+    return value
+
+
+def _column_type(kind: Any) -> Optional[ColumnType]:
+    # Allow ``None`` inside a tuple as shorthand for ``type(None)``.
+    if isinstance(kind, tuple):
+        return tuple(type(None) if item is None else item for item in kind)
+    return kind
+
+
+def _matches(value: Any, kind: ColumnType) -> bool:
+    kinds = kind if isinstance(kind, tuple) else (kind,)
+    cls = type(value)
+    # Normalization turns integral floats such as 0.0 into ints.
+    return cls in kinds or (cls is int and float in kinds)
+
+
+def _type_name(kind: ColumnType) -> str:
+    kinds: List[Type[Any]] = list(kind) if isinstance(kind, tuple) else [kind]
+    return " or ".join(getattr(item, "__name__", repr(item)) for item in kinds)
@@ -0,0 +1,131 @@
+"""Streaming output helpers that avoid materializing the encoded document."""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import hashlib
+import lzma
+import os
+import queue
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+from .encoder import Encoder, OptionsLike
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+COMPRESSION_OPENERS: Dict[str, Callable[..., BinaryIO]] = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".lzma": "xz",
+}
+
+INFER = "infer"
+
+# Number of encoded chunks that may wait for the compressor at once.
+MAX_PENDING_CHUNKS = 4
+
+
+def encode_to_file(
+    value: Any,
+    path: PathLike,
+    options: Union[Encoder, OptionsLike] = None,
+    *,
+    compression: Optional[str] = INFER,
+    encoding: str = "utf-8",
+) -> None:
+    """Encode ``value`` as TOON and stream it into the file at ``path``.
+
+    ``compression`` is one of ``"gzip"``, ``"bz2"``, ``"xz"`` or ``None``; by
+    default it is inferred from the file extension. ``options`` may also be an
+    existing :class:`~toon.Encoder`. Output is produced and compressed in
+    bounded chunks, with compression running on a background thread so it
+    overlaps with encoding.
+    """
+    encoder = options if isinstance(options, Encoder) else Encoder(options)
+    compression = resolve_compression(path, compression)
+
+    if compression is None:
+        with open(path, "w", encoding=encoding, newline="") as handle:
+            encoder.stream(value, handle.write)
+        return
+
+    with COMPRESSION_OPENERS[compression](path, "wb") as handle:
+        sink = _BackgroundSink(lambda chunk: handle.write(chunk.encode(encoding)))
+        try:
+            encoder.stream(value, sink)
+        finally:
+            sink.close()
+
+
+def digest(
+    value: Any,
+    options: Union[Encoder, OptionsLike] = None,
+    algorithm: str = "sha256",
+    *,
+    encoding: str = "utf-8",
+) -> str:
+    """Return the hex digest of the TOON encoding of ``value``.
+
+    The result equals ``hashlib.new(algorithm, encode(value).encode(encoding)).hexdigest()``,
+    but encoded chunks are fed to the hash as they are produced and the full
+    document is never built. ``algorithm`` is any name ``hashlib.new`` accepts.
+    """
+    encoder = options if isinstance(options, Encoder) else Encoder(options)
+    hasher = hashlib.new(algorithm)
+    update = hasher.update
+    encoder.stream(value, lambda chunk: update(chunk.encode(encoding)))
+    return hasher.hexdigest()
+
+
+def resolve_compression(path: PathLike, compression: Optional[str] = INFER) -> Optional[str]:
+    """Return the compression to use for ``path``, inferring it if requested."""
+    if compression == INFER:
+        _, extension = os.path.splitext(os.fspath(path))
+        return COMPRESSION_EXTENSIONS.get(extension.lower())
+    if compression is not None and compression not in COMPRESSION_OPENERS:
+        raise ValueError(f"Unsupported compression {compression!r}")
+    return compression
+
+
+class _BackgroundSink:
+    """Pass chunks to ``write`` on a worker thread through a bounded queue."""
+
+    def __init__(self, write: Callable[[str], object]) -> None:
+        self._write = write
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="toon-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, chunk: str) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(chunk)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._write(chunk)
+            except BaseException as exc:  # re-raised on the encoding thread
+                self._error = exc
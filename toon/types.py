@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
 
-from .constants import DEFAULT_DELIMITER, DELIMITERS, Delimiter
+from .constants import AUTO_DELIMITER, DEFAULT_DELIMITER, DELIMITERS, Delimiter
+from .schema import Schema, SchemaLike, as_schema
 
 JsonPrimitive = Union[str, int, float, bool, None]
 JsonObject = Dict[str, "JsonValue"]
@@ -14,6 +15,7 @@ JsonValue = Union[JsonPrimitive, JsonObject, JsonArray]
 
 Depth = int
 LengthMarker = Union[str, bool]
+DefaultHook = Callable[[Any], Any]
 
 
 @dataclass(frozen=True)
@@ -23,6 +25,12 @@ class EncodeOptions:
     indent: Optional[int] = None
     delimiter: Optional[Delimiter] = None
     length_marker: LengthMarker = False
+    sparse_tabular: bool = False
+    flatten_depth: int = 0
+    default: Optional[DefaultHook] = None
+    schemas: Optional[Mapping[str, SchemaLike]] = None
+    verify_schemas: bool = False
+    matrix_arrays: bool = False
 
 
 @dataclass(frozen=True)
@@ -32,6 +40,12 @@ class ResolvedEncodeOptions:
     indent: int
     delimiter: Delimiter
     length_marker: LengthMarker
+    sparse_tabular: bool = False
+    flatten_depth: int = 0
+    default: Optional[DefaultHook] = None
+    schemas: Tuple[Tuple[Tuple[str, ...], Schema], ...] = ()
+    verify_schemas: bool = False
+    matrix_arrays: bool = False
 
 
 def resolve_options(options: Optional[EncodeOptions]) -> ResolvedEncodeOptions:
@@ -42,12 +56,40 @@ def resolve_options(options: Optional[EncodeOptions]) -> ResolvedEncodeOptions:
         else options.delimiter
     )
     length_marker: LengthMarker = False if options is None else options.length_marker
+    sparse_tabular = False if options is None else bool(options.sparse_tabular)
+    flatten_depth = 0 if options is None else options.flatten_depth
+    default = None if options is None else options.default
+    schemas = () if options is None or not options.schemas else _resolve_schemas(options.schemas)
+    verify_schemas = False if options is None else bool(options.verify_schemas)
+    matrix_arrays = False if options is None else bool(options.matrix_arrays)
 
     if indent < 0:
         raise ValueError("indent must be non-negative")
-    if delimiter not in DELIMITERS.values():
+    if delimiter not in DELIMITERS.values() and delimiter != AUTO_DELIMITER:
         raise ValueError(f"Unsupported delimiter {delimiter!r}")
     if length_marker not in (False, "#"):
         raise ValueError("length_marker must be False or '#'")
+    if not isinstance(flatten_depth, int) or flatten_depth < 0:
+        raise ValueError("flatten_depth must be a non-negative integer")
+    if default is not None and not callable(default):
+        raise TypeError("default must be callable or None")
 
-    return ResolvedEncodeOptions(indent=indent, delimiter=delimiter, length_marker=length_marker)
+    return ResolvedEncodeOptions(
+        indent=indent,
+        delimiter=delimiter,
+        length_marker=length_marker,
+        sparse_tabular=sparse_tabular,
+        flatten_depth=flatten_depth,
+        default=default,
+        schemas=schemas,
+        verify_schemas=verify_schemas,
+        matrix_arrays=matrix_arrays,
+    )
+
+
+def _resolve_schemas(schemas: Mapping[str, SchemaLike]) -> Tuple[Tuple[Tuple[str, ...], Schema], ...]:
+    # Paths are dotted key chains from the root; "" names a root array.
+    return tuple(
+        (tuple(path.split(".")) if path else (), as_schema(schema))
+        for path, schema in schemas.items()
+    )
@@ -2,24 +2,124 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import Callable, List, Optional, Sequence, Tuple
 
 from .types import Depth
 
+PRECOMPUTED_DEPTHS = 32
+
+
+def build_indent_table(indent_size: int, depths: int = PRECOMPUTED_DEPTHS) -> Tuple[str, ...]:
+    """Return the indentation prefix for each depth in ``range(depths)``."""
+    unit = " " * indent_size
+    return tuple(unit * depth for depth in range(depths))
+
 
 class LineWriter:
     """Collects lines with consistent indentation."""
 
-    __slots__ = ("_lines", "_indent_string")
+    __slots__ = ("_lines", "_indent_string", "_indents")
 
-    def __init__(self, indent_size: int) -> None:
+    def __init__(self, indent_size: int, indents: Optional[Sequence[str]] = None) -> None:
         self._lines: List[str] = []
         self._indent_string = " " * indent_size
+        self._indents = indents if indents is not None else build_indent_table(indent_size)
 
     def push(self, depth: Depth, content: str) -> None:
-        indent = self._indent_string * depth
-        self._lines.append(f"{indent}{content}")
+        try:
+            indent = self._indents[depth]
+        except IndexError:
+            indent = self._indent_string * depth
+        self._lines.append(indent + content)
+
+    def extend(self, lines: Sequence[str]) -> None:
+        """Append lines that are already indented."""
+        self._lines.extend(lines)
+
+    def mark(self) -> int:
+        """Return a position for :meth:`lines_since`."""
+        return len(self._lines)
+
+    def lines_since(self, mark: int) -> Optional[List[str]]:
+        """Return a copy of the lines written since ``mark``, if still held."""
+        return self._lines[mark:]
+
+    @property
+    def cache_limit(self) -> Optional[int]:
+        """Most lines an encoder may keep copies of for reuse, or ``None`` for no limit."""
+        return None
+
+    def lines(self) -> List[str]:
+        return self._lines
 
     def to_string(self) -> str:
         return "\n".join(self._lines)
 
+
+DEFAULT_CHUNK_LINES = 1024
+
+
+class StreamWriter(LineWriter):
+    """LineWriter that hands output to ``sink`` in chunks instead of keeping it.
+
+    Chunks are joined exactly as :meth:`LineWriter.to_string` would join them,
+    so concatenating everything passed to ``sink`` yields the full document.
+    Call :meth:`flush` once encoding is finished.
+    """
+
+    __slots__ = ("_sink", "_chunk_lines", "_started", "_flushed")
+
+    def __init__(
+        self,
+        indent_size: int,
+        sink: Callable[[str], object],
+        indents: Optional[Sequence[str]] = None,
+        chunk_lines: int = DEFAULT_CHUNK_LINES,
+    ) -> None:
+        super().__init__(indent_size, indents)
+        self._sink = sink
+        self._chunk_lines = max(1, chunk_lines)
+        self._started = False
+        self._flushed = 0
+
+    def push(self, depth: Depth, content: str) -> None:
+        try:
+            indent = self._indents[depth]
+        except IndexError:
+            indent = self._indent_string * depth
+        lines = self._lines
+        lines.append(indent + content)
+        if len(lines) >= self._chunk_lines:
+            self.flush()
+
+    def extend(self, lines: Sequence[str]) -> None:
+        self._lines.extend(lines)
+        if len(self._lines) >= self._chunk_lines:
+            self.flush()
+
+    def mark(self) -> int:
+        return self._flushed + len(self._lines)
+
+    def lines_since(self, mark: int) -> Optional[List[str]]:
+        # Lines already passed to the sink are gone.
+        start = mark - self._flushed
+        return self._lines[start:] if start >= 0 else None
+
+    @property
+    def cache_limit(self) -> Optional[int]:
+        # Copies of reused lines stay within one chunk, keeping memory bounded.
+        return self._chunk_lines
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        chunk = "\n".join(self._lines)
+        self._flushed += len(self._lines)
+        self._lines.clear()
+        if self._started:
+            chunk = "\n" + chunk
+        self._started = True
+        self._sink(chunk)
+
+    def to_string(self) -> str:
+        raise TypeError("StreamWriter output is passed to its sink and cannot be joined")